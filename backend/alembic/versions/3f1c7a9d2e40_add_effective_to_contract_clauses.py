@@ -0,0 +1,37 @@
+"""add effective to contract clauses
+
+Revision ID: 3f1c7a9d2e40
+Revises: b6d971e24198
+Create Date: 2026-10-19 10:12:41.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '3f1c7a9d2e40'
+down_revision = 'b6d971e24198'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # stored generated column: Postgres keeps it in sync with detected/confirmed
+    op.add_column(
+        "contract_clauses",
+        sa.Column(
+            "effective",
+            sa.Boolean(),
+            sa.Computed("COALESCE(confirmed, detected)", persisted=True),
+            nullable=False,
+        ),
+    )
+    # serves "contracts where clause X is effectively true/false" as an index scan
+    op.create_index(
+        "ix_contract_clauses_clause_type_effective",
+        "contract_clauses",
+        ["clause_type_id", "effective", "contract_id"],
+        unique=False,
+    )
+
+def downgrade():
+    op.drop_index("ix_contract_clauses_clause_type_effective", table_name="contract_clauses")
+    op.drop_column("contract_clauses", "effective")
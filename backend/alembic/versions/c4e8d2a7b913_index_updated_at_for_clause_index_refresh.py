@@ -0,0 +1,23 @@
+"""index updated_at for clause index refresh
+
+Revision ID: c4e8d2a7b913
+Revises: 3f1c7a9d2e40
+Create Date: 2026-10-19 11:02:17.530962
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'c4e8d2a7b913'
+down_revision = '3f1c7a9d2e40'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # incremental refresh of the in-memory clause index reads "changed since"
+    op.create_index('ix_contracts_updated_at', 'contracts', ['updated_at'], unique=False)
+    op.create_index('ix_contract_clauses_updated_at', 'contract_clauses', ['updated_at'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_contract_clauses_updated_at', table_name='contract_clauses')
+    op.drop_index('ix_contracts_updated_at', table_name='contracts')
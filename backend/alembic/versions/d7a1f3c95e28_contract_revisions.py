@@ -0,0 +1,37 @@
+"""contract revisions and detection evidence
+
+Revision ID: d7a1f3c95e28
+Revises: c4e8d2a7b913
+Create Date: 2026-10-19 14:20:41.108352
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'd7a1f3c95e28'
+down_revision = 'c4e8d2a7b913'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('contracts', sa.Column('parent_id', sa.Integer(), nullable=True))
+    op.add_column('contracts', sa.Column('revision', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('contracts', sa.Column('storage_kind', sa.String(length=10), server_default='full', nullable=False))
+    op.create_foreign_key('contracts_parent_id_fkey', 'contracts', 'contracts', ['parent_id'], ['id'])
+    # a linear chain: at most one revision per parent
+    op.create_unique_constraint('contracts_parent_id_key', 'contracts', ['parent_id'])
+
+    op.add_column('contract_clauses', sa.Column('evidence_start', sa.Integer(), nullable=True))
+    op.add_column('contract_clauses', sa.Column('evidence_end', sa.Integer(), nullable=True))
+    op.add_column('contract_clauses', sa.Column('patterns_digest', sa.String(length=16), nullable=True))
+
+def downgrade():
+    op.drop_column('contract_clauses', 'patterns_digest')
+    op.drop_column('contract_clauses', 'evidence_end')
+    op.drop_column('contract_clauses', 'evidence_start')
+
+    op.drop_constraint('contracts_parent_id_key', 'contracts', type_='unique')
+    op.drop_constraint('contracts_parent_id_fkey', 'contracts', type_='foreignkey')
+    op.drop_column('contracts', 'storage_kind')
+    op.drop_column('contracts', 'revision')
+    op.drop_column('contracts', 'parent_id')
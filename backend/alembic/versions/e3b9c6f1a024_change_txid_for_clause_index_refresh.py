@@ -0,0 +1,31 @@
+"""change txid for clause index refresh
+
+Revision ID: e3b9c6f1a024
+Revises: d7a1f3c95e28
+Create Date: 2026-10-19 18:05:12.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'e3b9c6f1a024'
+down_revision = 'd7a1f3c95e28'
+branch_labels = None
+depends_on = None
+
+CURRENT_TXID = sa.text("(pg_current_xact_id()::text::bigint)")
+
+def upgrade():
+    # the clause index refresh reads rows by writing transaction instead of
+    # updated_at (the app sets the column; the default backfills and covers
+    # rows written outside the ORM)
+    for table in ('contracts', 'contract_clauses'):
+        op.add_column(table, sa.Column('change_txid', sa.BigInteger(), server_default=CURRENT_TXID, nullable=False))
+        op.drop_index(f'ix_{table}_updated_at', table_name=table)
+        op.create_index(f'ix_{table}_change_txid', table, ['change_txid'], unique=False)
+
+def downgrade():
+    for table in ('contract_clauses', 'contracts'):
+        op.drop_index(f'ix_{table}_change_txid', table_name=table)
+        op.create_index(f'ix_{table}_updated_at', table, ['updated_at'], unique=False)
+        op.drop_column(table, 'change_txid')
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from contextlib import contextmanager
-from flask import current_app, jsonify
+from flask import current_app, g, jsonify
 from sqlalchemy.orm import Session
 
 
@@ -14,6 +14,17 @@ def json_error(code: str, status: int, **extra):
 
 @contextmanager
 def db_session():
-    engine = current_app.extensions["db_engine"]
-    with Session(engine) as session:
-        yield session
+    """
+    Request-scoped session: every block in one request shares a single
+    session (and at most one pooled connection); it is closed on teardown.
+    """
+    session = g.get("db_session")
+    if session is None:
+        session = g.db_session = Session(current_app.extensions["db_engine"])
+    yield session
+
+
+def close_db_session(exc: BaseException | None = None) -> None:
+    session = g.pop("db_session", None)
+    if session is not None:
+        session.close()  # rolls back anything left uncommitted, returns the connection
@@ -3,12 +3,17 @@ from __future__ import annotations
 import os
 
 from flask import Flask
-from sqlalchemy import create_engine
 
+from app.api._common import close_db_session
 from app.api.clause_types import bp as clause_types_bp
 from app.api.contracts import bp as contracts_bp
 from app.api.health import bp as health_bp
-from app.storage_local import LocalFileStorage
+from app.api.matrix import bp as matrix_bp
+from app.db import _env_bool, get_engine
+from app.services.clause_index import ClauseBitsetIndex
+from app.services.clause_library import ClauseLibrary, clause_library_listener
+from app.services.events import CLAUSE_LIBRARY_CHANNEL, ContractEventHub
+from app.storage import StorageRegistry, create_storage
 
 
 def create_app() -> Flask:
@@ -20,14 +25,46 @@ def create_app() -> Flask:
     app.config["DATABASE_URL"] = db_url
 
     app.config["MAX_CONTENT_LENGTH"] = int(os.getenv("MAX_UPLOAD_BYTES", "26214400"))
-    storage_dir = os.getenv("CONTRACT_STORAGE_DIR", "./data/contracts")
+    # every Nth revision of a contract is stored in full instead of as a delta
+    app.config["REVISION_SNAPSHOT_EVERY"] = int(os.getenv("REVISION_SNAPSHOT_EVERY", "10"))
 
-    engine = create_engine(db_url, pool_pre_ping=True)
-    app.extensions["db_engine"] = engine
-    app.extensions["storage"] = LocalFileStorage(storage_dir)
+    # one pooled engine per process, configured from DB_POOL_* env
+    app.extensions["db_engine"] = get_engine(db_url)
+    app.teardown_appcontext(close_db_session)
+    # New uploads go to CONTRACT_STORAGE_BACKEND; reads follow Contract.storage_backend.
+    app.extensions["storage"] = StorageRegistry(
+        create_storage(os.getenv("CONTRACT_STORAGE_BACKEND", "local"))
+    )
+
+    # One LISTEN connection per process feeds all SSE streams and clause
+    # library sync. LISTEN needs a session-level connection, which PgBouncer
+    # transaction pooling doesn't give, so that mode needs a direct URL.
+    listen_url = os.getenv("DATABASE_LISTEN_URL")
+    if not listen_url:
+        if _env_bool("DB_PGBOUNCER", False):
+            raise RuntimeError("DB_PGBOUNCER needs DATABASE_LISTEN_URL (a direct, non-pooled Postgres URL)")
+        listen_url = db_url
+    hub = ContractEventHub(listen_url)
+    app.extensions["event_hub"] = hub
+
+    # in-memory bitset copy of the matrix for matrix/stats/query reads
+    if _env_bool("CLAUSE_INDEX_ENABLED", True):
+        app.extensions["clause_index"] = ClauseBitsetIndex(
+            snapshot_path=os.getenv("CLAUSE_INDEX_PATH") or None,
+            refresh_interval=float(os.getenv("CLAUSE_INDEX_REFRESH_SECONDS", "1")),
+        )
+
+    # compiled clause library shared by uploads/revisions, kept in sync via NOTIFY
+    library = ClauseLibrary(on_use=hub.ensure_running)
+    app.extensions["clause_library"] = library
+    hub.add_listener(
+        CLAUSE_LIBRARY_CHANNEL,
+        clause_library_listener(library, app.extensions.get("clause_index")),
+    )
 
     app.register_blueprint(health_bp)  # /health, /health/db
     app.register_blueprint(clause_types_bp, url_prefix="/api/clause-types")
     app.register_blueprint(contracts_bp, url_prefix="/api/contracts")
+    app.register_blueprint(matrix_bp, url_prefix="/api/matrix")
 
     return app
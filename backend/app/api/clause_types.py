@@ -1,13 +1,19 @@
-from flask import Blueprint, jsonify, request
+from collections import Counter
+
+from flask import Blueprint, current_app, jsonify, request
 from pydantic import BaseModel, Field, ValidationError
 from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import IntegrityError
 
 from app.api._common import db_session, json_error
 from app.model import ClauseType, ClausePattern
+from app.services.clause_library import import_clause_types, invalid_regexes
+from app.services.events import notify_clause_library_changed
 
 bp = Blueprint("clause_types", __name__)
 
+MAX_IMPORT_CLAUSE_TYPES = 20_000
+
 
 class ClausePatternIn(BaseModel):
     pattern: str = Field(min_length=1, max_length=500)
@@ -17,6 +23,42 @@ class ClauseTypeIn(BaseModel):
     name: str = Field(min_length=1, max_length=200)
     patterns: list[ClausePatternIn] = Field(default_factory=list)
 
+class ClauseTypePatchIn(BaseModel):
+    name: str | None = Field(default=None, min_length=1, max_length=200)
+    # when given, replaces the clause type's patterns
+    patterns: list[ClausePatternIn] | None = None
+
+class ClauseLibraryImportIn(BaseModel):
+    clause_types: list[ClauseTypeIn] = Field(max_length=MAX_IMPORT_CLAUSE_TYPES)
+    # false: only add missing patterns, never remove any
+    replace_patterns: bool = True
+
+
+def _clause_type_json(ct: ClauseType) -> dict:
+    return {
+        "id": ct.id,
+        "name": ct.name,
+        "patterns": [
+            {"id": p.id, "pattern": p.pattern, "is_regex": p.is_regex}
+            for p in ct.patterns
+        ],
+    }
+
+def _stripped(patterns: list[ClausePatternIn]) -> list[ClausePatternIn]:
+    return [ClausePatternIn.model_construct(pattern=p.pattern.strip(), is_regex=p.is_regex) for p in patterns]
+
+def _library_changed(session, *, changed=(), deleted=()) -> None:
+    """Commit, then drop the affected compiled clause types (other processes via NOTIFY)."""
+    if changed or deleted:
+        notify_clause_library_changed(session, changed=changed, deleted=deleted)
+    session.commit()
+
+    current_app.extensions["clause_library"].invalidate([*changed, *deleted])
+    index = current_app.extensions.get("clause_index")
+    if index is not None:
+        for clause_type_id in deleted:
+            index.drop_clause_type(clause_type_id)
+
 @bp.get("")
 def list_clause_types():
     with db_session() as session:
@@ -27,19 +69,7 @@ def list_clause_types():
             .all()
         )
 
-        return jsonify({
-            "items": [
-                {
-                    "id": x.id,
-                    "name": x.name,
-                    "patterns": [
-                        {"pattern": p.pattern, "is_regex": p.is_regex}
-                        for p in x.patterns
-                    ],
-                }
-                for x in items
-            ]
-        }), 200
+        return jsonify({"items": [_clause_type_json(x) for x in items]}), 200
 
 @bp.post("")
 def create_clause_type():
@@ -48,23 +78,142 @@ def create_clause_type():
     except ValidationError as e:
         return json_error("validation_error", 400, details=e.errors())
 
+    patterns = _stripped(payload.patterns)
+    if bad := invalid_regexes(patterns):
+        return json_error("invalid_regex", 400, patterns=bad)
+
     with db_session() as session:
         ct = ClauseType(name=payload.name.strip())
 
-        for p in payload.patterns:
+        for p in patterns:
             ct.patterns.append(
-                ClausePattern(pattern=p.pattern.strip(), is_regex=p.is_regex)
+                ClausePattern(pattern=p.pattern, is_regex=p.is_regex)
             )
 
         session.add(ct)
         try:
-            session.commit()
+            session.flush()
+            _library_changed(session, changed=[ct.id])
         except IntegrityError:
             session.rollback()
             return json_error("clause_type_name_exists", 409)
 
+        return jsonify(_clause_type_json(ct)), 201
+
+@bp.patch("/<int:clause_type_id>")
+def update_clause_type(clause_type_id: int):
+    try:
+        payload = ClauseTypePatchIn.model_validate(request.get_json(force=True))
+    except ValidationError as e:
+        return json_error("validation_error", 400, details=e.errors())
+
+    patterns = _stripped(payload.patterns) if payload.patterns is not None else None
+    if patterns and (bad := invalid_regexes(patterns)):
+        return json_error("invalid_regex", 400, patterns=bad)
+
+    with db_session() as session:
+        ct = session.get(ClauseType, clause_type_id, options=[selectinload(ClauseType.patterns)])
+        if not ct:
+            return json_error("clause_type_not_found", 404)
+
+        if payload.name is not None:
+            ct.name = payload.name.strip()
+
+        if patterns is not None:
+            # keep rows whose pattern is unchanged, so only real edits recompile
+            wanted = {(p.pattern, p.is_regex) for p in patterns}
+            current = {(p.pattern, p.is_regex) for p in ct.patterns}
+            ct.patterns = [p for p in ct.patterns if (p.pattern, p.is_regex) in wanted]
+            ct.patterns += [
+                ClausePattern(pattern=pattern, is_regex=is_regex)
+                for pattern, is_regex in sorted(wanted - current)
+            ]
+
+        try:
+            session.flush()
+            _library_changed(session, changed=[ct.id])
+        except IntegrityError:
+            session.rollback()
+            return json_error("clause_type_name_exists", 409)
+
+        return jsonify(_clause_type_json(ct)), 200
+
+@bp.delete("/<int:clause_type_id>")
+def delete_clause_type(clause_type_id: int):
+    """Deletes the clause type with its patterns and matrix cells."""
+    with db_session() as session:
+        ct = session.get(ClauseType, clause_type_id)
+        if not ct:
+            return json_error("clause_type_not_found", 404)
+
+        session.delete(ct)
+        session.flush()
+        _library_changed(session, deleted=[clause_type_id])
+        return "", 204
+
+@bp.post("/<int:clause_type_id>/patterns")
+def add_pattern(clause_type_id: int):
+    try:
+        payload = ClausePatternIn.model_validate(request.get_json(force=True))
+    except ValidationError as e:
+        return json_error("validation_error", 400, details=e.errors())
+
+    (p,) = _stripped([payload])
+    if bad := invalid_regexes([p]):
+        return json_error("invalid_regex", 400, patterns=bad)
+
+    with db_session() as session:
+        if not session.get(ClauseType, clause_type_id):
+            return json_error("clause_type_not_found", 404)
+
+        row = ClausePattern(clause_type_id=clause_type_id, pattern=p.pattern, is_regex=p.is_regex)
+        session.add(row)
+        session.flush()
+        _library_changed(session, changed=[clause_type_id])
+
+        return jsonify({"id": row.id, "pattern": row.pattern, "is_regex": row.is_regex}), 201
+
+@bp.delete("/<int:clause_type_id>/patterns/<int:pattern_id>")
+def delete_pattern(clause_type_id: int, pattern_id: int):
+    with db_session() as session:
+        row = session.get(ClausePattern, pattern_id)
+        if not row or row.clause_type_id != clause_type_id:
+            return json_error("pattern_not_found", 404)
+
+        session.delete(row)
+        session.flush()
+        _library_changed(session, changed=[clause_type_id])
+        return "", 204
+
+@bp.post("/import")
+def import_library():
+    """
+    Bulk upsert of clause types (matched by name) with their patterns, in one
+    transaction, e.g. {"clause_types": [{"name": "Termination", "patterns": [...]}, ...]}.
+    """
+    try:
+        payload = ClauseLibraryImportIn.model_validate(request.get_json(force=True))
+    except ValidationError as e:
+        return json_error("validation_error", 400, details=e.errors())
+
+    items = [
+        ClauseTypeIn.model_construct(name=ct.name.strip(), patterns=_stripped(ct.patterns))
+        for ct in payload.clause_types
+    ]
+    dupes = [name for name, n in Counter(ct.name for ct in items).items() if n > 1]
+    if dupes:
+        return json_error("duplicate_clause_type_names", 400, names=sorted(dupes))
+    if bad := invalid_regexes(p for ct in items for p in ct.patterns):
+        return json_error("invalid_regex", 400, patterns=bad)
+
+    with db_session() as session:
+        summary = import_clause_types(session, items, replace_patterns=payload.replace_patterns)
+        _library_changed(session, changed=summary.changed_ids)
+
         return jsonify({
-            "id": ct.id,
-            "name": ct.name,
-            "patterns": [{"pattern": p.pattern, "is_regex": p.is_regex} for p in ct.patterns],
-        }), 201
+            "created": summary.created,
+            "updated": summary.updated,
+            "unchanged": summary.unchanged,
+            "patterns_added": summary.patterns_added,
+            "patterns_removed": summary.patterns_removed,
+        }), 200
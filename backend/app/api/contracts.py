@@ -1,44 +1,90 @@
 from __future__ import annotations
 
+import hashlib
+import io
+import json
 import os
+import queue
+import time
 from datetime import datetime, timezone
 
-from flask import Blueprint, current_app, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request
 from pydantic import BaseModel, ValidationError
-from sqlalchemy import and_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 
 from app.api._common import db_session, json_error
 from app.model import ClauseType, Contract, ContractClause
-from app.storage_local import LocalFileStorage
-from app.services.scanner import scan_contract_text
+from app.services.clause_index import ClauseBitsetIndex
+from app.services.clause_library import ClauseLibrary
+from app.services.clause_query import (
+    MAX_QUERY_NODES,
+    ContractQueryIn,
+    compile_where,
+    count_nodes,
+    iter_leaves,
+    resolve_clause_type_refs,
+)
+from app.services.events import ContractEventHub, contract_status_event, notify_contract_event
+from app.services.ingest import IngestPipeline, IngestRejected, decode_upload
+from app.services.matrix import clause_counts_select, detection_values, effective_is, matrix_json_select
+from app.services.revisions import (
+    DEFAULT_SNAPSHOT_EVERY,
+    diff_texts,
+    encode_delta,
+    rebuild_revision_text,
+    rescan_revision,
+    revision_chain,
+    store_as_delta,
+)
+from app.storage import StorageRegistry
 
 bp = Blueprint("contracts", __name__)
 
 ALLOWED_EXTS = {".txt", ".md", ".markdown"}
 
+SSE_HEARTBEAT_SECONDS = 15
+SSE_MAX_SECONDS = 300  # EventSource reconnects on its own; bounds idle streams
+
 
 def _allowed_filename(name: str) -> bool:
     _, ext = os.path.splitext(name.lower())
     return ext in ALLOWED_EXTS
 
 
+def _clause_index() -> ClauseBitsetIndex | None:
+    return current_app.extensions.get("clause_index")
+
+
+def _read_index(session) -> ClauseBitsetIndex | None:
+    """The clause index, refreshed for a read; None (use SQL) until it has loaded."""
+    index = _clause_index()
+    if index is None:
+        return None
+    index.refresh(session)
+    return index if index.loaded else None
+
+
+def _clause_library() -> ClauseLibrary:
+    return current_app.extensions["clause_library"]
+
+
 class ClauseOverrideIn(BaseModel):
     confirmed: bool | None
 
 
-@bp.post("")
-def upload_contract():
+def _uploaded_file():
+    """Validate the multipart upload: (file, original_filename), or (None, error response)."""
     if "file" not in request.files:
-        return json_error("missing_file", 400)
+        return None, json_error("missing_file", 400)
 
     f = request.files["file"]
     original_filename = (f.filename or "").strip()
     if not original_filename:
-        return json_error("missing_filename", 400)
+        return None, json_error("missing_filename", 400)
 
     if not _allowed_filename(original_filename):
-        return json_error(
+        return None, json_error(
             "unsupported_file_type",
             415,
             allowed=sorted(ALLOWED_EXTS),
@@ -47,25 +93,56 @@ def upload_contract():
     # Size guardrail (Flask also enforces MAX_CONTENT_LENGTH if set)
     max_bytes = current_app.config.get("MAX_CONTENT_LENGTH")
     if max_bytes and request.content_length and request.content_length > max_bytes:
-        return json_error("file_too_large", 413, max_bytes=max_bytes)
+        return None, json_error("file_too_large", 413, max_bytes=max_bytes)
 
-    # UTF-8 + "looks like text" sniff (first 64KB)
-    head = f.stream.read(64 * 1024)
-    if b"\x00" in head:
-        return json_error("binary_file_rejected", 400)
-    try:
-        head.decode("utf-8")
-    except UnicodeDecodeError:
-        return json_error(
-            "invalid_encoding",
-            400,
-            hint="upload UTF-8 text/markdown",
-        )
+    return f, original_filename
+
+
+def _storage_json(contract: Contract) -> dict:
+    return {
+        "backend": contract.storage_backend,
+        "key": contract.storage_key,
+        "kind": contract.storage_kind,
+        "size_bytes": contract.size_bytes,
+        "sha256": contract.sha256_hex,
+    }
+
+
+@bp.post("")
+def upload_contract():
+    f, original_filename = _uploaded_file()
+    if f is None:
+        return original_filename
 
-    storage: LocalFileStorage = current_app.extensions["storage"]
-    stored = storage.save(f.stream, original_filename=original_filename, first_chunk=head)
+    storage: StorageRegistry = current_app.extensions["storage"]
 
     with db_session() as session:
+        # Build the scanner up front (patterns come precompiled from the shared
+        # library) so validation (NUL bytes, strict UTF-8 over the whole file),
+        # hashing, storing and scanning share one pass. A library that can't
+        # be loaded fails the contract like any scan error.
+        library_error: Exception | None = None
+        try:
+            clause_types = _clause_library().clause_types(session)
+        except Exception as e:
+            clause_types, library_error = (), e
+        pipeline = IngestPipeline(clause_types)
+        session.rollback()  # don't hold a pooled connection while the body streams
+
+        try:
+            stored = storage.default.save(pipeline.wrap(f.stream), original_filename=original_filename)
+        except IngestRejected as e:
+            return json_error(e.code, 400, **e.extra)
+
+        scan_error = library_error
+        try:
+            scan_results = pipeline.finish()
+        except IngestRejected as e:
+            storage.get(stored.backend).delete(stored.key)
+            return json_error(e.code, 400, **e.extra)
+        except Exception as e:
+            scan_results, scan_error = [], e
+
         contract = Contract(
             original_filename=original_filename,
             storage_backend=stored.backend,
@@ -78,26 +155,11 @@ def upload_contract():
         session.flush()  # obtain contract.id before writing matrix rows
 
         try:
-            clause_types = (
-                session.query(ClauseType)
-                .options(selectinload(ClauseType.patterns))
-                .order_by(ClauseType.id)
-                .all()
-            )
-
-            with storage.open(stored.key) as fh:
-                contract_text = fh.read().decode("utf-8", errors="strict")
-
-            scan_results = scan_contract_text(contract_text, clause_types)
+            if scan_error is not None:
+                raise scan_error
 
             rows: list[ContractClause] = [
-                ContractClause(
-                    contract_id=contract.id,
-                    clause_type_id=r.clause_type_id,
-                    detected=r.detected,
-                    confirmed=None,
-                )
-                for r in scan_results
+                ContractClause(**detection_values(contract.id, r), confirmed=None) for r in scan_results
             ]
 
             session.add_all(rows)
@@ -106,8 +168,15 @@ def upload_contract():
             contract.processed_at = datetime.now(timezone.utc)
             contract.error_message = None
 
+            notify_contract_event(session, contract_status_event(contract))
             session.commit()
 
+            index = _clause_index()
+            if index is not None:
+                index.add_contract(contract.id)
+                for r in scan_results:
+                    index.set_cell(contract.id, r.clause_type_id, detected=r.detected, confirmed=None)
+
         except Exception as e:
             session.rollback()
 
@@ -116,6 +185,8 @@ def upload_contract():
             contract.processing_status = "failed"
             contract.processed_at = datetime.now(timezone.utc)
             contract.error_message = str(e)[:2000]
+            session.flush()
+            notify_contract_event(session, contract_status_event(contract))
             session.commit()
 
             return json_error("processing_failed", 500)
@@ -125,20 +196,26 @@ def upload_contract():
                 "id": contract.id,
                 "original_filename": contract.original_filename,
                 "processing_status": contract.processing_status,
-                "storage": {
-                    "backend": contract.storage_backend,
-                    "key": contract.storage_key,
-                    "size_bytes": contract.size_bytes,
-                    "sha256": contract.sha256_hex,
-                },
+                "storage": _storage_json(contract),
             }
         ), 201
 
 
 @bp.get("")
 def list_contracts():
+    # optional filter: ?clause_type_id=<id>&effective=true|false
+    clause_type_id = request.args.get("clause_type_id", type=int)
+    effective_raw = request.args.get("effective")
+    if (clause_type_id is None) != (effective_raw is None):
+        return json_error("validation_error", 400, hint="clause_type_id and effective go together")
+    if effective_raw is not None and effective_raw not in ("true", "false"):
+        return json_error("validation_error", 400, hint="effective must be true or false")
+
     with db_session() as session:
-        items = session.query(Contract).order_by(Contract.id.desc()).all()
+        q = session.query(Contract)
+        if clause_type_id is not None:
+            q = q.filter(effective_is(clause_type_id, effective_raw == "true"))
+        items = q.order_by(Contract.id.desc()).all()
         return jsonify(
             {
                 "items": [
@@ -155,44 +232,176 @@ def list_contracts():
         ), 200
 
 
-@bp.get("/<int:contract_id>")
-def get_contract(contract_id: int):
+@bp.post("/query")
+def query_contracts():
+    """
+    Contracts whose effective clause rulings satisfy a boolean expression, e.g.
+    {"where": {"and": [{"clause_type": "Termination", "effective": true},
+                       {"clause_type": "Liability Cap", "effective": false}]}}
+    Keyset-paginated by id (newest first): pass `next_after_id` back as `after_id`.
+    """
+    try:
+        payload = ContractQueryIn.model_validate(request.get_json(force=True))
+    except ValidationError as e:
+        return json_error("validation_error", 400, details=e.errors())
+
+    if count_nodes(payload.where) > MAX_QUERY_NODES:
+        return json_error("query_too_large", 400, max_nodes=MAX_QUERY_NODES)
+
+    with db_session() as session:
+        refs = {leaf.clause_type for leaf in iter_leaves(payload.where)}
+        ids_by_ref, missing = resolve_clause_type_refs(session, refs)
+        if missing:
+            return json_error("clause_type_not_found", 404, clause_types=missing)
+
+        q = session.query(
+            Contract.id,
+            Contract.original_filename,
+            Contract.processing_status,
+            Contract.created_at,
+            Contract.processed_at,
+        )
+        index = _read_index(session)
+        if index is not None:
+            # evaluate on bitsets, then fetch only the page's rows by primary key
+            ids = index.ids_desc(
+                index.evaluate(payload.where, ids_by_ref),
+                before_id=payload.after_id,
+                limit=payload.limit + 1,
+            )
+            q = q.filter(Contract.id.in_(ids))
+        else:
+            q = q.filter(compile_where(payload.where, ids_by_ref))
+            if payload.after_id is not None:
+                q = q.filter(Contract.id < payload.after_id)
+        rows = q.order_by(Contract.id.desc()).limit(payload.limit + 1).all()
+
+        page = rows[: payload.limit]
+        return jsonify(
+            {
+                "items": [
+                    {
+                        "id": c.id,
+                        "original_filename": c.original_filename,
+                        "processing_status": c.processing_status,
+                        "created_at": c.created_at.isoformat(),
+                        "processed_at": c.processed_at.isoformat() if c.processed_at else None,
+                    }
+                    for c in page
+                ],
+                "next_after_id": page[-1].id if len(rows) > payload.limit else None,
+            }
+        ), 200
+
+
+@bp.get("/stats")
+def contract_stats():
+    """Per clause type: how many contracts have it detected / confirmed / effective."""
+    with db_session() as session:
+        clause_types = session.query(ClauseType.id, ClauseType.name).order_by(ClauseType.name).all()
+
+        index = _read_index(session)
+        if index is not None:
+            total = index.contracts_bits().bit_count()
+            counts = index.counts([ct.id for ct in clause_types])
+        else:
+            total = session.query(func.count(Contract.id)).scalar()
+            rows = session.execute(clause_counts_select()).all()
+            counts = {r.clause_type_id: r._asdict() for r in rows}
+
+        empty = {"detected": 0, "confirmed_present": 0, "confirmed_missing": 0, "effective": 0}
+        return jsonify(
+            {
+                "contracts": total,
+                "clause_types": [
+                    {
+                        "id": ct.id,
+                        "name": ct.name,
+                        **{k: counts.get(ct.id, empty)[k] for k in empty},
+                    }
+                    for ct in clause_types
+                ],
+            }
+        ), 200
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def _event_stream(hub: ContractEventHub, q: queue.Queue, initial: list[dict], contract_id: int | None) -> Response:
+    # The generator runs after the request context (and its DB session) is gone,
+    # so an open stream holds no pooled connection. It does hold a server thread
+    # for up to SSE_MAX_SECONDS: serve with threaded or async workers (README).
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            for event in initial:
+                yield _sse(event)
+            deadline = time.monotonic() + SSE_MAX_SECONDS
+            while time.monotonic() < deadline:
+                try:
+                    event = q.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if contract_id is None or event.get("contract_id") == contract_id:
+                    yield _sse(event)
+        finally:
+            hub.unsubscribe(q)
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@bp.get("/events")
+def all_contract_events():
+    """SSE stream of status/progress events for every contract."""
+    hub: ContractEventHub = current_app.extensions["event_hub"]
+    return _event_stream(hub, hub.subscribe(), [], None)
+
+
+@bp.get("/<int:contract_id>/events")
+def contract_events(contract_id: int):
+    """SSE stream for one contract: the current status first, then every transition."""
+    hub: ContractEventHub = current_app.extensions["event_hub"]
+    q = hub.subscribe()  # before the snapshot, so no transition can fall in between
+
     with db_session() as session:
         c = session.get(Contract, contract_id)
         if not c:
+            hub.unsubscribe(q)
             return json_error("contract_not_found", 404)
+        snapshot = contract_status_event(c)
 
-        q = (
-            session.query(
-                ClauseType.id.label("clause_type_id"),
-                ClauseType.name.label("clause_type_name"),
-                ContractClause.detected.label("detected"),
-                ContractClause.confirmed.label("confirmed"),
-            )
-            .outerjoin(
-                ContractClause,
-                and_(
-                    ContractClause.contract_id == contract_id,
-                    ContractClause.clause_type_id == ClauseType.id,
-                ),
-            )
-            .order_by(ClauseType.name)
-        )
+    return _event_stream(hub, q, [snapshot], contract_id)
 
-        matrix = []
-        for row in q.all():
-            detected = bool(row.detected) if row.detected is not None else False
-            confirmed = row.confirmed  # can be None
-            effective = confirmed if confirmed is not None else detected
 
-            matrix.append(
+@bp.get("/<int:contract_id>")
+def get_contract(contract_id: int):
+    with db_session() as session:
+        c = session.get(Contract, contract_id)
+        if not c:
+            return json_error("contract_not_found", 404)
+
+        index = _read_index(session)
+        if index is not None and index.has_contract(contract_id):
+            clause_types = session.query(ClauseType.id, ClauseType.name).order_by(ClauseType.name).all()
+            cells = index.row(contract_id, [ct.id for ct in clause_types])
+            matrix = [
                 {
-                    "clause_type": {"id": row.clause_type_id, "name": row.clause_type_name},
-                    "detected": detected,
-                    "confirmed": confirmed,
-                    "effective": effective,
+                    "clause_type": {"id": ct.id, "name": ct.name},
+                    "detected": cells[ct.id][0],
+                    "confirmed": cells[ct.id][1],
+                    "effective": cells[ct.id][2],
                 }
-            )
+                for ct in clause_types
+            ]
+        else:
+            matrix = session.execute(matrix_json_select(contract_id)).scalar_one()
 
         return jsonify(
             {
@@ -203,12 +412,160 @@ def get_contract(contract_id: int):
                     "created_at": c.created_at.isoformat(),
                     "processed_at": c.processed_at.isoformat() if c.processed_at else None,
                     "error_message": c.error_message,
+                    "parent_id": c.parent_id,
+                    "revision": c.revision,
                 },
                 "matrix": matrix,
             }
         ), 200
 
 
+@bp.post("/<int:contract_id>/revisions")
+def upload_revision(contract_id: int):
+    """
+    Upload a new revision of a contract (the latest one of its chain).
+
+    The text is stored as a delta against the parent unless a full snapshot
+    is due; detection only rescans the edited regions, and unchanged
+    detections and human overrides are carried forward.
+    """
+    f, original_filename = _uploaded_file()
+    if f is None:
+        return original_filename
+
+    data = f.stream.read()  # bounded by MAX_CONTENT_LENGTH; the diff needs the whole text
+    try:
+        text = decode_upload(data)
+    except IngestRejected as e:
+        return json_error(e.code, 400, **e.extra)
+
+    storage: StorageRegistry = current_app.extensions["storage"]
+
+    with db_session() as session:
+        parent = session.get(Contract, contract_id)
+        if not parent:
+            return json_error("contract_not_found", 404)
+        child_id = session.query(Contract.id).filter(Contract.parent_id == contract_id).scalar()
+        if child_id is not None:
+            return json_error("not_latest_revision", 409, revision_id=child_id)
+
+        chain = revision_chain(session, parent)
+        parent_revision, parent_sha = parent.revision, parent.sha256_hex
+        parent_cells = {}
+        if parent.processing_status == "processed":  # otherwise nothing to carry forward
+            parent_cells = {
+                row.clause_type_id: row
+                for row in session.query(
+                    ContractClause.clause_type_id,
+                    ContractClause.detected,
+                    ContractClause.confirmed,
+                    ContractClause.evidence_start,
+                    ContractClause.evidence_end,
+                    ContractClause.patterns_digest,
+                ).filter(ContractClause.contract_id == contract_id)
+            }
+        library_error: Exception | None = None
+        try:
+            clause_types = _clause_library().clause_types(session)
+        except Exception as e:
+            clause_types, library_error = (), e
+        # don't hold a pooled connection (or the index watermark) while the
+        # parent text is rebuilt, diffed and rescanned
+        session.rollback()
+
+        parent_text, depth = rebuild_revision_text(chain, storage)
+        diff = diff_texts(parent_text, text)
+        scan, scan_error = None, library_error
+        if scan_error is None:
+            try:
+                scan = rescan_revision(text, diff, clause_types, parent_cells)
+            except Exception as e:
+                scan_error = e
+
+        delta = encode_delta(diff, parent_sha)
+        snapshot_every = current_app.config.get("REVISION_SNAPSHOT_EVERY", DEFAULT_SNAPSHOT_EVERY)
+        if store_as_delta(len(delta), len(data), depth, snapshot_every):
+            stored = storage.default.save(io.BytesIO(delta), original_filename=f"{original_filename}.delta")
+            storage_kind = "delta"
+        else:
+            stored = storage.default.save(io.BytesIO(data), original_filename=original_filename)
+            storage_kind = "full"
+
+        contract = Contract(
+            original_filename=original_filename,
+            storage_backend=stored.backend,
+            storage_key=stored.key,
+            storage_kind=storage_kind,
+            size_bytes=len(data),  # size and hash always describe the revision's text
+            sha256_hex=hashlib.sha256(data).hexdigest(),
+            processing_status="processing",
+            parent_id=contract_id,
+            revision=parent_revision + 1,
+        )
+        session.add(contract)
+        try:
+            session.flush()
+        except IntegrityError:  # a concurrent revision of the same parent won
+            session.rollback()
+            storage.get(stored.backend).delete(stored.key)
+            return json_error("not_latest_revision", 409)
+
+        try:
+            if scan_error is not None:
+                raise scan_error
+
+            confirmed = {ct_id: cell.confirmed for ct_id, cell in parent_cells.items()}
+            rows: list[ContractClause] = [
+                ContractClause(**detection_values(contract.id, r), confirmed=confirmed.get(r.clause_type_id))
+                for r in scan.results
+            ]
+            session.add_all(rows)
+
+            contract.processing_status = "processed"
+            contract.processed_at = datetime.now(timezone.utc)
+            contract.error_message = None
+
+            notify_contract_event(session, contract_status_event(contract))
+            session.commit()
+
+            index = _clause_index()
+            if index is not None:
+                index.add_contract(contract.id)
+                for r in scan.results:
+                    index.set_cell(
+                        contract.id, r.clause_type_id, detected=r.detected, confirmed=confirmed.get(r.clause_type_id)
+                    )
+
+        except Exception as e:
+            session.rollback()
+
+            session.add(contract)
+            contract.processing_status = "failed"
+            contract.processed_at = datetime.now(timezone.utc)
+            contract.error_message = str(e)[:2000]
+            session.flush()
+            notify_contract_event(session, contract_status_event(contract))
+            session.commit()
+
+            return json_error("processing_failed", 500)
+
+        return jsonify(
+            {
+                "id": contract.id,
+                "original_filename": contract.original_filename,
+                "processing_status": contract.processing_status,
+                "parent_id": contract.parent_id,
+                "revision": contract.revision,
+                "storage": _storage_json(contract),
+                "scan": {
+                    "carried_forward": scan.carried,
+                    "full_scans": scan.full_scans,
+                    "scanned_chars": scan.scanned_chars,
+                },
+            }
+        ), 201
+
+
 @bp.patch("/<int:contract_id>/clauses/<int:clause_type_id>")
 def set_clause_override(contract_id: int, clause_type_id: int):
     try:
@@ -247,10 +604,15 @@ def set_clause_override(contract_id: int, clause_type_id: int):
         row.confirmed = payload.confirmed
         session.commit()
 
+        index = _clause_index()
+        if index is not None:
+            index.set_cell(contract_id, clause_type_id, detected=row.detected, confirmed=row.confirmed)
+
         return jsonify(
             {
                 "contract_id": contract_id,
                 "clause_type_id": clause_type_id,
                 "confirmed": row.confirmed,
+                "effective": row.effective,
             }
         ), 200
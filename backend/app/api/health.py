@@ -3,6 +3,8 @@ from __future__ import annotations
 from flask import Blueprint, current_app, jsonify
 from sqlalchemy import text
 
+from app.db import pool_status
+
 bp = Blueprint("health", __name__)
 
 @bp.get("/health")
@@ -18,3 +20,7 @@ def health_db():
         return jsonify({"db": "ok"}), 200
     except Exception:
         return jsonify({"db": "down"}), 503
+
+@bp.get("/health/db/pool")
+def health_db_pool():
+    return jsonify(pool_status(current_app.extensions["db_engine"])), 200
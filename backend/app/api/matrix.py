@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from flask import Blueprint, Response, request, stream_with_context
+
+from app.api._common import db_session, json_error
+from app.services.export import EXPORT_FORMATS, matrix_export_select
+
+bp = Blueprint("matrix", __name__)
+
+# rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_ROWS = 5000
+
+
+def _parse_datetime(name: str) -> datetime | None:
+    raw = request.args.get(name)
+    if not raw:
+        return None
+    return datetime.fromisoformat(raw)
+
+
+@bp.get("/export")
+def export_matrix():
+    """
+    Stream the contracts × clause types matrix.
+
+    Query params: format=csv|ndjson|parquet, clause_type_id (repeatable),
+    created_from / created_to (ISO 8601, contract upload time, [from, to)).
+    """
+    fmt = request.args.get("format", "csv")
+    writer_cls = EXPORT_FORMATS.get(fmt)
+    if writer_cls is None:
+        return json_error("unsupported_format", 400, allowed=sorted(EXPORT_FORMATS))
+
+    try:
+        created_from = _parse_datetime("created_from")
+        created_to = _parse_datetime("created_to")
+    except ValueError:
+        return json_error("validation_error", 400, hint="created_from/created_to must be ISO 8601")
+
+    try:
+        clause_type_ids = [int(v) for v in request.args.getlist("clause_type_id")]
+    except ValueError:
+        return json_error("validation_error", 400, hint="clause_type_id must be an integer")
+
+    try:
+        writer = writer_cls()
+    except RuntimeError as e:
+        return json_error("format_unavailable", 501, format=fmt, detail=str(e))
+
+    stmt = matrix_export_select(
+        clause_type_ids=clause_type_ids,
+        created_from=created_from,
+        created_to=created_to,
+    )
+
+    def generate():
+        yield writer.header()
+        with db_session() as session:
+            # yield_per => server-side cursor: only one batch is in memory at a time
+            result = session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_ROWS))
+            for batch in result.partitions():
+                chunk = writer.write_batch(batch)
+                if chunk:
+                    yield chunk
+            session.rollback()  # end the read transaction, release the connection
+        yield writer.finish()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=writer.mimetype,
+        headers={"Content-Disposition": f'attachment; filename="matrix.{writer.extension}"'},
+    )
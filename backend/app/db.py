@@ -1,11 +1,150 @@
 import os
-from sqlalchemy import create_engine, text
+import threading
+import weakref
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+_engine: Engine | None = None
+_engine_lock = threading.Lock()
+_pool_metrics: "weakref.WeakKeyDictionary[Engine, PoolMetrics]" = weakref.WeakKeyDictionary()
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None or raw == "":
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def engine_options_from_env() -> dict:
+    """
+    Pool settings for `create_engine`, driven by env:
+
+    - DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT / DB_POOL_RECYCLE
+    - DB_POOL_PRE_PING: off by default; DB_POOL_RECYCLE retires connections
+      before server/proxy idle timeouts instead of a ping per checkout
+    - DB_PGBOUNCER: PgBouncer (transaction pooling) owns the pool, so keep no
+      idle connections here and don't use server-side prepared statements
+    """
+    if _env_bool("DB_PGBOUNCER", False):
+        return {
+            "poolclass": NullPool,
+            "pool_pre_ping": False,
+            "connect_args": {"prepare_threshold": None},
+        }
+
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "5")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", False),
+        "pool_use_lifo": True,  # lets surplus idle connections age out via recycle
+    }
+
+
+class PoolMetrics:
+    """Counters fed by pool events; read through `pool_status`."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.max_checked_out = 0
+        self._checked_out = 0
+
+    def attach(self, engine: Engine) -> None:
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_conn, record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_conn, record, proxy):
+        with self._lock:
+            self.checkouts += 1
+            self._checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self._checked_out)
+
+    def _on_checkin(self, dbapi_conn, record):
+        with self._lock:
+            self.checkins += 1
+            self._checked_out = max(0, self._checked_out - 1)
+
+    def _on_invalidate(self, dbapi_conn, record, exc):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "checked_out": self._checked_out,
+                "max_checked_out": self.max_checked_out,
+            }
+
+
+def create_configured_engine(url: str) -> Engine:
+    engine = create_engine(url, **engine_options_from_env())
+    metrics = PoolMetrics()
+    metrics.attach(engine)
+    _pool_metrics[engine] = metrics
+    return engine
+
+
+def get_engine(url: str | None = None) -> Engine:
+    """The one engine (and pool) of this process."""
+    global _engine
+
+    if _engine is not None:
+        return _engine
+
+    with _engine_lock:
+        if _engine is None:
+            url = url or os.getenv("DATABASE_URL")
+            if not url:
+                raise RuntimeError("DATABASE_URL is not set")
+            _engine = create_configured_engine(url)
+        return _engine
+
+
+def _reset_pool_after_fork() -> None:
+    # A forked child (e.g. gunicorn --preload) must not reuse the parent's
+    # sockets: drop the inherited connections without closing them, so the
+    # child's pool starts empty and the parent's connections stay intact.
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+
+def pool_status(engine: Engine) -> dict:
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if not isinstance(pool, NullPool):
+        status.update(
+            {
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+            }
+        )
+    metrics = _pool_metrics.get(engine)
+    if metrics is not None:
+        status.update(metrics.snapshot())
+    return status
 
-def get_engine():
-    url = os.getenv("DATABASE_URL")
-    if not url:
-        raise RuntimeError("DATABASE_URL is not set")
-    return create_engine(url, pool_pre_ping=True)
 
 def ping_db(engine) -> bool:
     try:
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import Integer, String, UniqueConstraint, ForeignKey, Boolean, Index, DateTime, BigInteger, Text, func
+from sqlalchemy import Integer, String, UniqueConstraint, ForeignKey, Boolean, Index, DateTime, BigInteger, Text, Computed, cast, func
 from datetime import datetime
 
 
@@ -19,6 +19,10 @@ class TimestampMixin:
         nullable=False,
     )
 
+def _current_txid():
+    # id of the writing transaction (xid8, as bigint); see ClauseBitsetIndex.refresh
+    return cast(cast(func.pg_current_xact_id(), Text), BigInteger)
+
 class ClauseType(TimestampMixin, Base):
     __tablename__ = "clause_types"
     __table_args__ = (UniqueConstraint("name", name="uq_clause_types_name"),)
@@ -65,8 +69,21 @@ class Contract(TimestampMixin, Base):
     processed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
 
+    # revision chain: each revision points at the one it replaces (at most one child)
+    parent_id: Mapped[int | None] = mapped_column(
+        ForeignKey("contracts.id"), nullable=True, unique=True
+    )
+    revision: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    # "full": storage_key holds the text; "delta": edits against the parent's text
+    storage_kind: Mapped[str] = mapped_column(String(10), nullable=False, default="full", server_default="full")
+
+    change_txid: Mapped[int] = mapped_column(
+        BigInteger, default=_current_txid(), onupdate=_current_txid(), nullable=False
+    )
+
 
 Index("ix_contracts_sha256_hex", Contract.sha256_hex)
+Index("ix_contracts_change_txid", Contract.change_txid)
 
 class ContractClause(TimestampMixin, Base):
     __tablename__ = "contract_clauses"
@@ -85,6 +102,28 @@ class ContractClause(TimestampMixin, Base):
 
     detected: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
     confirmed: Mapped[bool | None] = mapped_column(Boolean, nullable=True)  # user override
+    # final ruling, maintained by Postgres: confirmed if not null else detected
+    effective: Mapped[bool] = mapped_column(
+        Boolean,
+        Computed("COALESCE(confirmed, detected)", persisted=True),
+        nullable=False,
+    )
+    # first match, as [start, end) characters of the original text
+    evidence_start: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    evidence_end: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # patterns the detection ran with (scanner.patterns_digest)
+    patterns_digest: Mapped[str | None] = mapped_column(String(16), nullable=True)
+
+    change_txid: Mapped[int] = mapped_column(
+        BigInteger, default=_current_txid(), onupdate=_current_txid(), nullable=False
+    )
 
 Index("ix_contract_clauses_contract_id", ContractClause.contract_id)
-Index("ix_contract_clauses_clause_type_id", ContractClause.clause_type_id)
\ No newline at end of file
+Index("ix_contract_clauses_clause_type_id", ContractClause.clause_type_id)
+Index("ix_contract_clauses_change_txid", ContractClause.change_txid)
+Index(
+    "ix_contract_clauses_clause_type_effective",
+    ContractClause.clause_type_id,
+    ContractClause.effective,
+    ContractClause.contract_id,
+)
\ No newline at end of file
@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+from sqlalchemy import null, or_, select, text, union_all
+
+from app.model import Contract, ContractClause
+from app.services.clause_query import AndExpr, ClauseExpr, ClauseLeaf, OrExpr
+
+# Rows carry the id of the transaction that last wrote them (change_txid).
+# A refresh remembers which transactions its read could not see yet (those at
+# or after the snapshot's xmax, and those still in progress) and next time
+# reads exactly their rows, so a late commit is never skipped and an old open
+# transaction elsewhere doesn't make the lookback grow.
+_CURRENT_SNAPSHOT = text("SELECT pg_current_snapshot()::text")
+
+# Deleted contracts leave no row behind; the full contract id set is re-read
+# this often to drop them.
+RECONCILE_SECONDS = 300
+
+_SNAPSHOT_MAGIC = b"CLIDX2\n"
+
+
+@dataclass(frozen=True)
+class Watermark:
+    """Transactions a refresh did not see: txid >= xmax, or one of `in_progress`."""
+
+    xmax: int
+    in_progress: tuple[int, ...] = ()
+
+    @classmethod
+    def parse(cls, snapshot: str) -> "Watermark":
+        """From pg_snapshot text, "xmin:xmax:xip,..."."""
+        _, xmax, xip = snapshot.split(":")
+        return cls(int(xmax), tuple(int(x) for x in xip.split(",") if x))
+
+    def unseen(self, txid_col):
+        cond = txid_col >= self.xmax
+        return or_(cond, txid_col.in_(self.in_progress)) if self.in_progress else cond
+
+
+def _set_bit(col: bytearray, i: int, value: bool) -> None:
+    byte = i >> 3
+    if byte >= len(col):
+        if not value:
+            return
+        col.extend(bytes(max(byte + 1 - len(col), len(col))))  # grow geometrically
+    if value:
+        col[byte] |= 1 << (i & 7)
+    else:
+        col[byte] &= ~(1 << (i & 7)) & 0xFF
+
+
+def _get_bit(col: bytearray, i: int) -> bool:
+    byte = i >> 3
+    return byte < len(col) and bool(col[byte] >> (i & 7) & 1)
+
+
+def _as_int(col: bytearray) -> int:
+    # little-endian: bit i of the int is contract id i
+    return int.from_bytes(col, "little")
+
+
+class ClauseBitsetIndex:
+    """
+    In-process, bit-packed copy of the contract × clause type matrix.
+
+    Stored column-wise: per clause type, one bit per contract id for
+    `detected`, `overridden` (confirmed is not null) and `confirmed`. Counting
+    or filtering a clause across all contracts is then a handful of big-int
+    operations plus `int.bit_count()` (a C popcount), not a SQL scan; a
+    single contract's row is a bit lookup per clause type.
+
+    Writes from this process are applied directly; writes from other
+    processes are pulled in by `refresh` via `change_txid`, deletions by a
+    periodic reconcile of the contract ids. A refresh never makes readers
+    wait: while one runs they see the current state, and until the first
+    load has finished (`loaded`) reads should go to SQL, as should
+    contracts the index doesn't know yet (`has_contract`).
+    """
+
+    def __init__(self, *, snapshot_path: str | None = None, refresh_interval: float = 1.0):
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()  # one refresh at a time, never waited for
+        self._contracts = bytearray()
+        self._detected: dict[int, bytearray] = {}
+        self._overridden: dict[int, bytearray] = {}
+        self._confirmed: dict[int, bytearray] = {}
+        self._watermark: Watermark | None = None
+        self._last_refresh = 0.0
+        self._last_snapshot = 0.0
+        self._last_reconcile = 0.0
+        self.refresh_interval = refresh_interval
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+
+        if self.snapshot_path and self.snapshot_path.exists():
+            self.load(self.snapshot_path)
+
+    # -- writes -----------------------------------------------------------
+
+    def add_contract(self, contract_id: int) -> None:
+        with self._lock:
+            _set_bit(self._contracts, contract_id, True)
+
+    def set_cell(self, contract_id: int, clause_type_id: int, *, detected: bool, confirmed: bool | None) -> None:
+        with self._lock:
+            _set_bit(self._detected.setdefault(clause_type_id, bytearray()), contract_id, detected)
+            _set_bit(self._overridden.setdefault(clause_type_id, bytearray()), contract_id, confirmed is not None)
+            _set_bit(self._confirmed.setdefault(clause_type_id, bytearray()), contract_id, bool(confirmed))
+
+    def drop_clause_type(self, clause_type_id: int) -> None:
+        with self._lock:
+            self._detected.pop(clause_type_id, None)
+            self._overridden.pop(clause_type_id, None)
+            self._confirmed.pop(clause_type_id, None)
+
+    def remove_contract(self, contract_id: int) -> None:
+        with self._lock:
+            _set_bit(self._contracts, contract_id, False)
+            for cols in (self._detected, self._overridden, self._confirmed):
+                for col in cols.values():
+                    _set_bit(col, contract_id, False)
+
+    # -- reads ------------------------------------------------------------
+
+    @property
+    def loaded(self) -> bool:
+        """A full load (or snapshot) is in; until then reads should use SQL."""
+        return self._watermark is not None
+
+    def has_contract(self, contract_id: int) -> bool:
+        with self._lock:
+            return _get_bit(self._contracts, contract_id)
+
+    def contracts_bits(self) -> int:
+        with self._lock:
+            return _as_int(self._contracts)
+
+    def effective_bits(self, clause_type_id: int) -> int:
+        with self._lock:
+            det = _as_int(self._detected.get(clause_type_id, b""))
+            ov = _as_int(self._overridden.get(clause_type_id, b""))
+            cf = _as_int(self._confirmed.get(clause_type_id, b""))
+        return (det & ~ov) | (cf & ov)
+
+    def row(self, contract_id: int, clause_type_ids: Iterable[int]) -> dict[int, tuple[bool, bool | None, bool]]:
+        """clause_type_id -> (detected, confirmed, effective) for one contract."""
+        out = {}
+        with self._lock:
+            for ct_id in clause_type_ids:
+                detected = _get_bit(self._detected.get(ct_id, b""), contract_id)
+                confirmed = (
+                    _get_bit(self._confirmed.get(ct_id, b""), contract_id)
+                    if _get_bit(self._overridden.get(ct_id, b""), contract_id)
+                    else None
+                )
+                out[ct_id] = (detected, confirmed, confirmed if confirmed is not None else detected)
+        return out
+
+    def counts(self, clause_type_ids: Iterable[int]) -> dict[int, dict[str, int]]:
+        contracts = self.contracts_bits()
+        out = {}
+        for ct_id in clause_type_ids:
+            with self._lock:
+                det = _as_int(self._detected.get(ct_id, b"")) & contracts
+                ov = _as_int(self._overridden.get(ct_id, b"")) & contracts
+                cf = _as_int(self._confirmed.get(ct_id, b"")) & contracts
+            out[ct_id] = {
+                "detected": det.bit_count(),
+                "confirmed_present": (cf & ov).bit_count(),
+                "confirmed_missing": (ov & ~cf).bit_count(),
+                "effective": ((det & ~ov) | (cf & ov)).bit_count(),
+            }
+        return out
+
+    def evaluate(self, expr: ClauseExpr, ids_by_ref: dict[int | str, int]) -> int:
+        """Bitmask of contract ids satisfying the query-by-clause expression."""
+        return self._eval(expr, ids_by_ref, self.contracts_bits())
+
+    def _eval(self, expr: ClauseExpr, ids_by_ref: dict[int | str, int], universe: int) -> int:
+        if isinstance(expr, ClauseLeaf):
+            eff = self.effective_bits(ids_by_ref[expr.clause_type]) & universe
+            return eff if expr.effective else universe & ~eff
+        if isinstance(expr, AndExpr):
+            bits = universe
+            for e in expr.and_:
+                bits &= self._eval(e, ids_by_ref, universe)
+                if not bits:
+                    break
+            return bits
+        if isinstance(expr, OrExpr):
+            bits = 0
+            for e in expr.or_:
+                bits |= self._eval(e, ids_by_ref, universe)
+            return bits
+        return universe & ~self._eval(expr.not_, ids_by_ref, universe)
+
+    @staticmethod
+    def ids_desc(bits: int, *, before_id: int | None = None, limit: int) -> list[int]:
+        """Highest set bits first (newest contracts), optionally below a cursor id."""
+        if before_id is not None:
+            bits &= (1 << max(before_id, 0)) - 1
+        ids = []
+        while bits and len(ids) < limit:
+            top = bits.bit_length() - 1
+            ids.append(top)
+            bits ^= 1 << top
+        return ids
+
+    # -- sync with the database -------------------------------------------
+
+    def refresh(self, session, *, force: bool = False) -> None:
+        """
+        Pull rows changed by any process since the last refresh; the first
+        call (without a snapshot) loads everything. Throttled to
+        `refresh_interval` seconds; returns right away if another thread is
+        already refreshing.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.refresh_interval:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+
+        try:
+            # taken before reading rows: whatever it can't see yet is read next time
+            horizon = Watermark.parse(session.execute(_CURRENT_SNAPSHOT).scalar_one())
+            since = self._watermark
+
+            contracts_q = select(Contract.id, null(), null(), null())
+            cells_q = select(
+                ContractClause.contract_id,
+                ContractClause.clause_type_id,
+                ContractClause.detected,
+                ContractClause.confirmed,
+            )
+            if since is not None:
+                contracts_q = contracts_q.where(since.unseen(Contract.change_txid))
+                cells_q = cells_q.where(since.unseen(ContractClause.change_txid))
+
+            # one statement, so contracts and their cells come from one snapshot;
+            # new contracts are only added once their cells are in
+            new_contracts = []
+            rows = session.execute(union_all(contracts_q, cells_q).execution_options(yield_per=10_000))
+            for contract_id, clause_type_id, detected, confirmed in rows:
+                if clause_type_id is None:
+                    new_contracts.append(contract_id)
+                else:
+                    self.set_cell(contract_id, clause_type_id, detected=detected, confirmed=confirmed)
+            for contract_id in new_contracts:
+                self.add_contract(contract_id)
+
+            if since is not None and now - self._last_reconcile > RECONCILE_SECONDS:
+                self._reconcile_contracts(session)
+            elif since is None:
+                self._last_reconcile = now
+
+            self._watermark = horizon
+            self._last_refresh = now
+
+            if self.snapshot_path and (since is None or now - self._last_snapshot > 300):
+                self.save(self.snapshot_path)
+                self._last_snapshot = now
+        finally:
+            self._refresh_lock.release()
+
+    def _reconcile_contracts(self, session) -> None:
+        present = bytearray()
+        for (contract_id,) in session.execute(select(Contract.id).execution_options(yield_per=10_000)):
+            _set_bit(present, contract_id, True)
+        gone = self.contracts_bits() & ~_as_int(present)
+        while gone:
+            contract_id = gone.bit_length() - 1
+            self.remove_contract(contract_id)
+            gone ^= 1 << contract_id
+        self._last_reconcile = time.monotonic()
+
+    # -- persistence --------------------------------------------------------
+
+    def save(self, path: Path) -> None:
+        """Write a snapshot (atomically replaced) that `load` reads back in."""
+        with self._lock:
+            columns = [("contracts", 0, self._contracts)]
+            for name, cols in (("detected", self._detected), ("overridden", self._overridden), ("confirmed", self._confirmed)):
+                columns.extend((name, ct_id, col) for ct_id, col in cols.items())
+            wm = self._watermark
+            header = {
+                "watermark": [wm.xmax, list(wm.in_progress)] if wm else None,
+                "columns": [[name, ct_id, len(col)] for name, ct_id, col in columns],
+            }
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "wb") as out:
+                out.write(_SNAPSHOT_MAGIC)
+                out.write(json.dumps(header).encode("utf-8") + b"\n")
+                for _, _, col in columns:
+                    out.write(col)
+            os.replace(tmp, path)
+
+    def load(self, path: Path) -> None:
+        """Read a snapshot back in; the columns are copied into this process's memory."""
+        with open(path, "rb") as fh:
+            if fh.read(len(_SNAPSHOT_MAGIC)) != _SNAPSHOT_MAGIC:
+                return  # unknown format: rebuild from the database instead
+            header = json.loads(fh.readline())
+
+            targets = {"detected": self._detected, "overridden": self._overridden, "confirmed": self._confirmed}
+            with self._lock:
+                for name, ct_id, length in header["columns"]:
+                    col = bytearray(fh.read(length))
+                    if name == "contracts":
+                        self._contracts = col
+                    else:
+                        targets[name][ct_id] = col
+                wm = header["watermark"]
+                self._watermark = Watermark(wm[0], tuple(wm[1])) if wm else None
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable, Sequence
+
+from sqlalchemy import delete, func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.model import ClausePattern, ClauseType
+from app.services.scanner import REGEX_FLAGS, CompiledClauseType, compile_pattern
+
+
+def invalid_regexes(patterns: Iterable) -> list[dict]:
+    """Regex patterns that don't compile, as {"pattern", "error"}."""
+    bad = []
+    for p in patterns:
+        if p.is_regex:
+            try:
+                re.compile(p.pattern, REGEX_FLAGS)
+            except re.error as e:
+                bad.append({"pattern": p.pattern, "error": str(e)})
+    return bad
+
+
+def _compile(pattern: str, is_regex: bool) -> re.Pattern | re.error | None:
+    # A broken stored regex fails the scans that use its clause type (the
+    # contract is recorded as failed), not the whole library.
+    try:
+        return compile_pattern(pattern, is_regex)
+    except re.error as e:
+        return e
+
+
+class ClauseLibrary:
+    """
+    Process-wide compiled clause library, shared by uploads and revisions.
+
+    Library edits only invalidate the clause types they touch (in this process
+    directly, in the others via NOTIFY). The next reader reloads just those
+    rows and recompiles only patterns that are new; everything else keeps its
+    compiled form. Readers get an immutable snapshot, so an edit never blocks
+    or changes a scan that is already running; while a reload is in flight,
+    other readers keep getting the previous snapshot. Only the first load has
+    no snapshot to serve, so readers wait for it.
+    """
+
+    def __init__(self, *, on_use=None):
+        self._on_use = on_use  # e.g. hub.ensure_running: sync must be live before the cache is trusted
+        self._lock = threading.Lock()
+        self._loaded_cond = threading.Condition(self._lock)
+        # clause_type_id -> {(pattern, is_regex): compiled, or the re.error it raised}
+        self._compiled: dict[int, dict[tuple[str, bool], re.Pattern | re.error | None]] = {}
+        self._types: dict[int, CompiledClauseType] = {}
+        self._snapshot: tuple[CompiledClauseType, ...] = ()
+        self._stale = True  # everything needs a reload
+        self._loaded = False  # a full load has installed a snapshot
+        self._first_load = False  # in flight
+        self._dirty: set[int] = set()
+        # Bumped by every invalidate. A reload only installs rows for clause
+        # types not invalidated since it started; the others may have been
+        # read before the edit, so they stay marked for the next reader.
+        self._generation = 0
+        self._all_invalidated_at = 0
+        self._invalidated_at: dict[int, int] = {}
+        self._reloads = 0  # in flight
+
+    def invalidate(self, clause_type_ids: Iterable[int] | None = None) -> None:
+        """Mark clause types (None: the whole library) for reload on next use."""
+        with self._lock:
+            self._generation += 1
+            if clause_type_ids is None:
+                self._stale = True
+                self._all_invalidated_at = self._generation
+            else:
+                for ct_id in clause_type_ids:
+                    self._dirty.add(ct_id)
+                    self._invalidated_at[ct_id] = self._generation
+
+    def clause_types(self, session) -> tuple[CompiledClauseType, ...]:
+        """Current compiled clause types, ordered by id."""
+        if self._on_use is not None:
+            self._on_use()
+        with self._lock:
+            while self._first_load:
+                self._loaded_cond.wait()
+            if not self._stale and not self._dirty:
+                return self._snapshot
+            stale, dirty = self._stale, self._dirty
+            self._stale, self._dirty = False, set()
+            first = not self._loaded
+            self._first_load = first
+            if not self._reloads:
+                self._invalidated_at.clear()  # only reloads in flight compare against it
+            self._reloads += 1
+            started = self._generation
+        try:
+            self._reload(session, None if stale else dirty, started)
+        except BaseException:
+            self.invalidate(None if stale else dirty)  # retry on the next call
+            raise
+        finally:
+            with self._lock:
+                self._reloads -= 1
+                if first:
+                    self._first_load = False
+                    self._loaded_cond.notify_all()
+        return self._snapshot
+
+    def _reload(self, session, clause_type_ids: set[int] | None, started: int) -> None:
+        types_q = select(ClauseType.id)
+        patterns_q = select(ClausePattern.clause_type_id, ClausePattern.pattern, ClausePattern.is_regex)
+        if clause_type_ids is not None:
+            types_q = types_q.where(ClauseType.id.in_(clause_type_ids))
+            patterns_q = patterns_q.where(ClausePattern.clause_type_id.in_(clause_type_ids))
+        present = set(session.execute(types_q).scalars())
+        keys: dict[int, set[tuple[str, bool]]] = defaultdict(set)
+        for ct_id, pattern, is_regex in session.execute(patterns_q):
+            keys[ct_id].add((pattern, is_regex))
+
+        targets = present if clause_type_ids is None else clause_type_ids
+        with self._lock:
+            previous = self._compiled
+        # compile outside the lock; unchanged patterns reuse their compiled form
+        fresh: dict[int, dict[tuple[str, bool], re.Pattern | re.error | None]] = {}
+        for ct_id in targets & present:
+            old = previous.get(ct_id, {})
+            fresh[ct_id] = {k: old[k] if k in old else _compile(*k) for k in keys[ct_id]}
+
+        with self._lock:
+            if self._all_invalidated_at > started:
+                self._stale = True
+            newer = {ct_id for ct_id, gen in self._invalidated_at.items() if gen > started}
+            self._dirty |= newer
+
+            if clause_type_ids is None:
+                # keep what is installed for clause types edited since the read
+                compiled = {ct_id: self._compiled[ct_id] for ct_id in newer if ct_id in self._compiled}
+                types = {ct_id: self._types[ct_id] for ct_id in newer if ct_id in self._types}
+            else:
+                compiled, types = dict(self._compiled), dict(self._types)
+            for ct_id in targets - newer:
+                if ct_id in fresh:
+                    compiled[ct_id] = fresh[ct_id]
+                    types[ct_id] = CompiledClauseType.from_compiled(ct_id, fresh[ct_id])
+                else:
+                    compiled.pop(ct_id, None)
+                    types.pop(ct_id, None)
+            self._compiled, self._types = compiled, types
+            self._snapshot = tuple(types[ct_id] for ct_id in sorted(types))
+            if clause_type_ids is None:
+                self._loaded = True
+
+
+def clause_library_listener(library: ClauseLibrary, index=None):
+    """Event hub callback for CLAUSE_LIBRARY_CHANNEL (see notify_clause_library_changed)."""
+
+    def handle(payload: dict | None) -> None:
+        if payload is None or payload.get("all"):
+            library.invalidate()
+            return
+        deleted = payload.get("deleted", [])
+        library.invalidate([*payload.get("changed", []), *deleted])
+        if index is not None:
+            for clause_type_id in deleted:
+                index.drop_clause_type(clause_type_id)
+
+    return handle
+
+
+@dataclass
+class ImportSummary:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    patterns_added: int = 0
+    patterns_removed: int = 0
+    changed_ids: list[int] = field(default_factory=list)
+
+
+def import_clause_types(session, items: Sequence, *, replace_patterns: bool = True) -> ImportSummary:
+    """
+    Upsert clause types by name, with their patterns, in a few set-based
+    statements (the caller commits):
+
+    1. one INSERT .. ON CONFLICT (name) for all clause types
+    2. one SELECT of the existing patterns of those clause types
+    3. one DELETE of patterns no longer listed (if `replace_patterns`)
+    4. one multi-row INSERT of the new patterns
+
+    `items`: objects with name + patterns (pattern/is_regex); names must be
+    unique within the import.
+    """
+    summary = ImportSummary()
+    if not items:
+        return summary
+
+    stmt = insert(ClauseType).values([{"name": item.name} for item in items])
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_clause_types_name",
+        set_={"updated_at": func.now()},
+    ).returning(ClauseType.id, ClauseType.name, literal_column("xmax = 0").label("inserted"))
+    ids_by_name, inserted = {}, set()
+    for ct_id, name, was_inserted in session.execute(stmt):
+        ids_by_name[name] = ct_id
+        if was_inserted:
+            inserted.add(ct_id)
+
+    existing: dict[int, dict[tuple[str, bool], int]] = defaultdict(dict)
+    rows = session.execute(
+        select(ClausePattern.id, ClausePattern.clause_type_id, ClausePattern.pattern, ClausePattern.is_regex)
+        .where(ClausePattern.clause_type_id.in_(list(ids_by_name.values())))
+    )
+    for pattern_id, ct_id, pattern, is_regex in rows:
+        existing[ct_id][(pattern, is_regex)] = pattern_id
+
+    to_delete: list[int] = []
+    to_insert: list[dict] = []
+    for item in items:
+        ct_id = ids_by_name[item.name]
+        wanted = {(p.pattern, p.is_regex) for p in item.patterns}
+        have = existing[ct_id]
+        added = [k for k in wanted if k not in have]
+        removed = [pid for k, pid in have.items() if k not in wanted] if replace_patterns else []
+
+        to_insert += [{"clause_type_id": ct_id, "pattern": p, "is_regex": r} for p, r in added]
+        to_delete += removed
+        summary.patterns_added += len(added)
+        summary.patterns_removed += len(removed)
+        if ct_id in inserted:
+            summary.created += 1
+        elif added or removed:
+            summary.updated += 1
+        else:
+            summary.unchanged += 1
+            continue
+        summary.changed_ids.append(ct_id)
+
+    if to_delete:
+        session.execute(delete(ClausePattern).where(ClausePattern.id.in_(to_delete)))
+    if to_insert:
+        session.execute(insert(ClausePattern), to_insert)  # executemany, batched by the driver
+    return summary
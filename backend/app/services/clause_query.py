@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from typing import Union
+
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import and_, not_, or_
+
+from app.model import ClauseType
+from app.services.matrix import effective_is
+
+MAX_QUERY_NODES = 200
+
+
+class ClauseLeaf(BaseModel):
+    """`{"clause_type": <id or name>, "effective": true|false}`"""
+
+    model_config = ConfigDict(extra="forbid")
+
+    clause_type: int | str
+    effective: bool = True
+
+
+class AndExpr(BaseModel):
+    model_config = ConfigDict(extra="forbid", populate_by_name=True)
+
+    and_: list["ClauseExpr"] = Field(alias="and", min_length=1)
+
+
+class OrExpr(BaseModel):
+    model_config = ConfigDict(extra="forbid", populate_by_name=True)
+
+    or_: list["ClauseExpr"] = Field(alias="or", min_length=1)
+
+
+class NotExpr(BaseModel):
+    model_config = ConfigDict(extra="forbid", populate_by_name=True)
+
+    not_: "ClauseExpr" = Field(alias="not")
+
+
+ClauseExpr = Union[ClauseLeaf, AndExpr, OrExpr, NotExpr]
+
+AndExpr.model_rebuild()
+OrExpr.model_rebuild()
+NotExpr.model_rebuild()
+
+
+class ContractQueryIn(BaseModel):
+    where: ClauseExpr
+    limit: int = Field(default=50, ge=1, le=1000)
+    after_id: int | None = None  # keyset cursor: last id of the previous page
+
+
+def iter_leaves(expr: ClauseExpr):
+    if isinstance(expr, ClauseLeaf):
+        yield expr
+    elif isinstance(expr, AndExpr):
+        for e in expr.and_:
+            yield from iter_leaves(e)
+    elif isinstance(expr, OrExpr):
+        for e in expr.or_:
+            yield from iter_leaves(e)
+    else:
+        yield from iter_leaves(expr.not_)
+
+
+def count_nodes(expr: ClauseExpr) -> int:
+    if isinstance(expr, ClauseLeaf):
+        return 1
+    if isinstance(expr, AndExpr):
+        return 1 + sum(count_nodes(e) for e in expr.and_)
+    if isinstance(expr, OrExpr):
+        return 1 + sum(count_nodes(e) for e in expr.or_)
+    return 1 + count_nodes(expr.not_)
+
+
+def compile_where(expr: ClauseExpr, ids_by_ref: dict[int | str, int]):
+    """
+    Compile the expression into one filter on `Contract`.
+
+    `ids_by_ref` maps every clause type reference used in the expression (id
+    or name) to its id. Each leaf becomes an indexed EXISTS probe on
+    `contract_clauses`.
+    """
+    if isinstance(expr, ClauseLeaf):
+        return effective_is(ids_by_ref[expr.clause_type], expr.effective)
+    if isinstance(expr, AndExpr):
+        return and_(*(compile_where(e, ids_by_ref) for e in expr.and_))
+    if isinstance(expr, OrExpr):
+        return or_(*(compile_where(e, ids_by_ref) for e in expr.or_))
+    return not_(compile_where(expr.not_, ids_by_ref))
+
+
+def resolve_clause_type_refs(session, refs: set[int | str]) -> tuple[dict[int | str, int], list[int | str]]:
+    """Map ids/names to clause type ids in one query; also return the unknown refs."""
+    ids = {r for r in refs if isinstance(r, int)}
+    names = {r.strip() for r in refs if isinstance(r, str)}
+
+    rows = (
+        session.query(ClauseType.id, ClauseType.name)
+        .filter(or_(ClauseType.id.in_(ids), ClauseType.name.in_(names)))
+        .all()
+    )
+    known_ids = {r.id for r in rows}
+    id_by_name = {r.name: r.id for r in rows}
+
+    resolved: dict[int | str, int] = {}
+    missing: list[int | str] = []
+    for ref in refs:
+        if isinstance(ref, int):
+            if ref in known_ids:
+                resolved[ref] = ref
+            else:
+                missing.append(ref)
+        elif ref.strip() in id_by_name:
+            resolved[ref] = id_by_name[ref.strip()]
+        else:
+            missing.append(ref)
+    return resolved, missing
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Iterable
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+log = logging.getLogger(__name__)
+
+CONTRACT_EVENTS_CHANNEL = "contract_events"
+CLAUSE_LIBRARY_CHANNEL = "clause_library"
+
+# Postgres caps NOTIFY payloads at 8000 bytes; events stay far below that.
+_MAX_ERROR_CHARS = 200
+
+
+def contract_status_event(contract) -> dict:
+    # carries the list row's fields, so clients can add contracts they haven't seen
+    return {
+        "type": "status",
+        "contract_id": contract.id,
+        "original_filename": contract.original_filename,
+        "created_at": contract.created_at.isoformat() if contract.created_at else None,
+        "processing_status": contract.processing_status,
+        "processed_at": contract.processed_at.isoformat() if contract.processed_at else None,
+        "error_message": (contract.error_message or "")[:_MAX_ERROR_CHARS] or None,
+    }
+
+
+def notify_contract_event(conn, event: dict) -> None:
+    """
+    Queue an event on the contract events channel.
+
+    `conn` is a Session or Connection. Postgres delivers the notification
+    only when that transaction commits, so listeners never see a status
+    that was rolled back.
+    """
+    conn.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": CONTRACT_EVENTS_CHANNEL, "payload": json.dumps(event)},
+    )
+
+
+def notify_clause_library_changed(conn, *, changed: Iterable[int] = (), deleted: Iterable[int] = ()) -> None:
+    """
+    Tell every process which clause types to reload (delivered on commit).
+
+    Payloads that would exceed the NOTIFY limit fall back to "reload
+    everything" ({"all": true}).
+    """
+    payload = json.dumps({"changed": sorted(changed), "deleted": sorted(deleted)})
+    if len(payload) > 7000:
+        payload = json.dumps({"all": True})
+    conn.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": CLAUSE_LIBRARY_CHANNEL, "payload": payload},
+    )
+
+
+class ContractEventHub:
+    """
+    Fans out contract events to in-process subscribers (SSE streams).
+
+    One background thread per process holds a single dedicated LISTEN
+    connection, so events published by any backend process reach every
+    subscriber without each stream occupying a pooled connection.
+
+    The same connection serves other channels through `add_listener`
+    callbacks (e.g. clause library invalidation). Callbacks get the decoded
+    payload, or None after (re)connecting, when notifications may have been
+    missed.
+    """
+
+    def __init__(self, db_url: str, *, channel: str = CONTRACT_EVENTS_CHANNEL):
+        # plain libpq URL for psycopg (drop the SQLAlchemy "+psycopg" driver suffix)
+        self._dsn = make_url(db_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self._channel = channel
+        self._subscribers: set[queue.Queue] = set()
+        self._listeners: dict[str, list[Callable[[dict | None], None]]] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def _ensure_thread(self) -> None:
+        # caller holds self._lock; also restarts the thread in a forked worker
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="contract-event-hub", daemon=True)
+            self._thread.start()
+
+    def ensure_running(self) -> None:
+        with self._lock:
+            self._ensure_thread()
+
+    def add_listener(self, channel: str, callback: Callable[[dict | None], None]) -> None:
+        """Register before the listener thread starts (channels are LISTENed on connect)."""
+        with self._lock:
+            self._listeners.setdefault(channel, []).append(callback)
+
+    def subscribe(self, maxsize: int = 1000) -> queue.Queue:
+        q: queue.Queue = queue.Queue(maxsize=maxsize)
+        with self._lock:
+            self._subscribers.add(q)
+            self._ensure_thread()
+        return q
+
+    def unsubscribe(self, q: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def _dispatch(self, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                pass  # a stalled client must not block the others
+
+    def _call_listeners(self, channel: str, payload: str | None) -> None:
+        try:
+            data = json.loads(payload) if payload is not None else None
+        except ValueError:
+            return
+        with self._lock:
+            callbacks = list(self._listeners.get(channel, ()))
+        for callback in callbacks:
+            try:
+                callback(data)
+            except Exception:
+                log.exception("listener for %s failed", channel)
+
+    def _run(self) -> None:
+        import psycopg
+
+        backoff = 1.0
+        while True:
+            try:
+                with psycopg.connect(self._dsn, autocommit=True) as conn:
+                    with self._lock:
+                        channels = list(self._listeners)
+                    for channel in [self._channel, *channels]:
+                        conn.execute(f"LISTEN {channel}")
+                    backoff = 1.0
+                    for channel in channels:
+                        self._call_listeners(channel, None)  # anything before LISTEN was missed
+                    while True:
+                        for n in conn.notifies(timeout=5.0):
+                            if n.channel == self._channel:
+                                self._dispatch(n.payload)
+                            else:
+                                self._call_listeners(n.channel, n.payload)
+            except Exception:
+                log.exception("contract event listener failed; reconnecting in %.0fs", backoff)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
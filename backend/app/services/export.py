@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Sequence
+
+from sqlalchemy import Select, and_, false, func, select, true
+
+from app.model import ClauseType, Contract, ContractClause
+
+EXPORT_COLUMNS = (
+    "contract_id",
+    "original_filename",
+    "contract_created_at",
+    "clause_type_id",
+    "clause_type_name",
+    "detected",
+    "confirmed",
+    "effective",
+)
+
+
+def matrix_export_select(
+    *,
+    clause_type_ids: Sequence[int] = (),
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> Select:
+    """
+    One row per (contract, clause type) cell, ordered by contract then clause type.
+
+    Cells without a matrix row are exported as not detected, same as the
+    contract detail matrix.
+    """
+    stmt = (
+        select(
+            Contract.id,
+            Contract.original_filename,
+            Contract.created_at,
+            ClauseType.id,
+            ClauseType.name,
+            func.coalesce(ContractClause.detected, false()),
+            ContractClause.confirmed,
+            func.coalesce(ContractClause.effective, false()),
+        )
+        .select_from(Contract)
+        .join(ClauseType, true())
+        .outerjoin(
+            ContractClause,
+            and_(
+                ContractClause.contract_id == Contract.id,
+                ContractClause.clause_type_id == ClauseType.id,
+            ),
+        )
+        .order_by(Contract.id, ClauseType.id)
+    )
+    if clause_type_ids:
+        stmt = stmt.where(ClauseType.id.in_(clause_type_ids))
+    if created_from is not None:
+        stmt = stmt.where(Contract.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(Contract.created_at < created_to)
+    return stmt
+
+
+class CsvExportWriter:
+    mimetype = "text/csv"
+    extension = "csv"
+
+    def __init__(self):
+        self._buf = io.StringIO()
+        self._csv = csv.writer(self._buf)
+
+    def _drain(self) -> bytes:
+        data = self._buf.getvalue().encode("utf-8")
+        self._buf.seek(0)
+        self._buf.truncate()
+        return data
+
+    def header(self) -> bytes:
+        self._csv.writerow(EXPORT_COLUMNS)
+        return self._drain()
+
+    def write_batch(self, rows) -> bytes:
+        for r in rows:
+            r = list(r)
+            r[2] = r[2].isoformat()
+            self._csv.writerow(r)
+        return self._drain()
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class NdjsonExportWriter:
+    mimetype = "application/x-ndjson"
+    extension = "ndjson"
+
+    def header(self) -> bytes:
+        return b""
+
+    def write_batch(self, rows) -> bytes:
+        lines = []
+        for r in rows:
+            record = dict(zip(EXPORT_COLUMNS, r))
+            record["contract_created_at"] = record["contract_created_at"].isoformat()
+            lines.append(json.dumps(record, ensure_ascii=False))
+        return ("\n".join(lines) + "\n").encode("utf-8") if lines else b""
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _DrainSink:
+    """Append-only file object for ParquetWriter whose written bytes can be taken out."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ParquetExportWriter:
+    """One row group per fetched batch; the footer is written by `finish`."""
+
+    mimetype = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def __init__(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:  # optional dependency
+            raise RuntimeError("parquet export requires pyarrow (install the 'parquet' extra)") from None
+
+        self._pa = pa
+        self._schema = pa.schema(
+            [
+                ("contract_id", pa.int32()),
+                ("original_filename", pa.string()),
+                ("contract_created_at", pa.timestamp("us", tz="UTC")),
+                ("clause_type_id", pa.int32()),
+                ("clause_type_name", pa.string()),
+                ("detected", pa.bool_()),
+                ("confirmed", pa.bool_()),
+                ("effective", pa.bool_()),
+            ]
+        )
+        self._sink = _DrainSink()
+        self._writer = pq.ParquetWriter(self._sink, self._schema, compression="zstd")
+
+    def header(self) -> bytes:
+        return self._sink.drain()
+
+    def write_batch(self, rows) -> bytes:
+        columns = list(zip(*rows)) if rows else [[] for _ in EXPORT_COLUMNS]
+        table = self._pa.Table.from_arrays(
+            [self._pa.array(col, type=field.type) for col, field in zip(columns, self._schema)],
+            schema=self._schema,
+        )
+        self._writer.write_table(table)
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+EXPORT_FORMATS = {
+    "csv": CsvExportWriter,
+    "ndjson": NdjsonExportWriter,
+    "parquet": ParquetExportWriter,
+}
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import codecs
+from typing import BinaryIO, Iterable
+
+from app.services.normalize import TextNormalizer
+from app.services.scanner import ScanResult, StreamingScanner
+
+
+class IngestRejected(Exception):
+    """The upload is not acceptable text; `code`/`extra` become the JSON error."""
+
+    def __init__(self, code: str, **extra):
+        super().__init__(code)
+        self.code = code
+        self.extra = extra
+
+
+def decode_upload(data: bytes) -> str:
+    """The pipeline's text checks for an upload that is already in memory."""
+    if b"\x00" in data:
+        raise IngestRejected("binary_file_rejected")
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        raise IngestRejected("invalid_encoding", hint="upload UTF-8 text/markdown") from None
+
+
+class _ObservedStream:
+    """Passes every chunk the storage backend reads through `on_chunk` first."""
+
+    def __init__(self, stream: BinaryIO, on_chunk):
+        self._stream = stream
+        self._on_chunk = on_chunk
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._stream.read(size)
+        if chunk:
+            self._on_chunk(chunk)
+        return chunk
+
+
+class IngestPipeline:
+    """
+    Single-pass upload processing.
+
+    Wrap the upload stream with `wrap()` and hand it to `storage.save`: while
+    the backend hashes and writes each chunk, the same chunk is checked for
+    NUL bytes, decoded as strict UTF-8 (incrementally, over the whole file),
+    normalized and fed to the streaming scanner. Memory stays bounded by the
+    chunk size.
+
+    Invalid input raises IngestRejected from inside `save`, which discards
+    the partial object. Scanner errors (e.g. a broken regex) don't abort the
+    upload; they are kept in `scan_error` so the contract can be recorded as
+    failed.
+    """
+
+    def __init__(self, clause_types: Iterable):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="strict")
+        self._normalizer = TextNormalizer()
+        self.scan_error: Exception | None = None
+        self.scanner: StreamingScanner | None = None
+        try:
+            self.scanner = StreamingScanner(clause_types, offsets=self._normalizer.offsets)
+        except Exception as e:
+            self.scan_error = e
+
+    def wrap(self, stream: BinaryIO) -> BinaryIO:
+        return _ObservedStream(stream, self.feed)
+
+    def _decode(self, chunk: bytes, final: bool = False) -> str:
+        try:
+            return self._decoder.decode(chunk, final)
+        except UnicodeDecodeError:
+            raise IngestRejected("invalid_encoding", hint="upload UTF-8 text/markdown") from None
+
+    def _process(self, text: str) -> None:
+        if self.scanner is None or self.scan_error is not None:
+            return
+        try:
+            self.scanner.feed_raw(text)
+            if self.scanner.needs_normalized:
+                self.scanner.feed_normalized(self._normalizer.feed(text))
+        except Exception as e:
+            self.scan_error = e
+
+    def feed(self, chunk: bytes) -> None:
+        if b"\x00" in chunk:
+            raise IngestRejected("binary_file_rejected")
+        self._process(self._decode(chunk))
+
+    def finish(self) -> list[ScanResult]:
+        """Flush the decoder (a truncated UTF-8 sequence is rejected) and return scan results."""
+        self._process(self._decode(b"", final=True))
+        if self.scan_error is not None:
+            raise self.scan_error
+        try:
+            return self.scanner.results()
+        except Exception as e:
+            self.scan_error = e
+            raise
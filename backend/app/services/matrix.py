@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from sqlalchemy import Select, and_, exists, false, func, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from app.model import ClauseType, Contract, ContractClause
+
+
+def matrix_json_select(contract_id: int) -> Select:
+    """
+    Single-value query: the contract's matrix as a JSON array, ordered by
+    clause type name and assembled by Postgres (`json_agg`).
+
+    Clause types without a matrix row (e.g. added after the upload) are
+    reported as not detected.
+    """
+    row = func.json_build_object(
+        "clause_type", func.json_build_object("id", ClauseType.id, "name", ClauseType.name),
+        "detected", func.coalesce(ContractClause.detected, false()),
+        "confirmed", ContractClause.confirmed,
+        "effective", func.coalesce(ContractClause.effective, false()),
+    )
+    return (
+        select(
+            func.coalesce(
+                func.json_agg(aggregate_order_by(row, ClauseType.name)),
+                literal_column("'[]'::json"),
+            )
+        )
+        .select_from(ClauseType)
+        .outerjoin(
+            ContractClause,
+            and_(
+                ContractClause.contract_id == contract_id,
+                ContractClause.clause_type_id == ClauseType.id,
+            ),
+        )
+    )
+
+
+def effective_is(clause_type_id: int, value: bool):
+    """
+    Filter on `Contract`: the effective ruling for one clause type equals `value`.
+
+    A missing matrix row counts as not present, same as in the matrix read.
+    Served by ix_contract_clauses_clause_type_effective.
+    """
+    present = exists().where(
+        ContractClause.contract_id == Contract.id,
+        ContractClause.clause_type_id == clause_type_id,
+        ContractClause.effective,
+    )
+    return present if value else ~present
+
+
+def clause_counts_select() -> Select:
+    """
+    Per clause type with matrix rows: contracts detected / confirmed present /
+    confirmed missing / effective. Clause types without rows are left out.
+    """
+    return select(
+        ContractClause.clause_type_id,
+        func.count().filter(ContractClause.detected).label("detected"),
+        func.count().filter(ContractClause.confirmed.is_(True)).label("confirmed_present"),
+        func.count().filter(ContractClause.confirmed.is_(False)).label("confirmed_missing"),
+        func.count().filter(ContractClause.effective).label("effective"),
+    ).group_by(ContractClause.clause_type_id)
+
+
+def detection_values(contract_id: int, result) -> dict:
+    """ContractClause column values for one ScanResult."""
+    start, end = result.evidence or (None, None)
+    return {
+        "contract_id": contract_id,
+        "clause_type_id": result.clause_type_id,
+        "detected": result.detected,
+        "evidence_start": start,
+        "evidence_end": end,
+        "patterns_digest": result.patterns_digest,
+    }
+
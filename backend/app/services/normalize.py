@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import re
+from array import array
+from bisect import bisect_right
+
+# Runs of whitespace and markdown formatting characters. A run containing
+# whitespace becomes one space; a run of only markup (e.g. "**") vanishes, so
+# neither "**Termination**" nor a line break inside a phrase hides a keyword.
+_JUNK_RUN = re.compile(r"[\s*_`~#>]+")
+_HAS_SPACE = re.compile(r"\s")
+
+
+class OffsetMap:
+    """
+    Maps normalized character offsets back to original character offsets.
+
+    Stored as breakpoints (norm_offset, orig_offset): between two breakpoints
+    the mapping is linear, so only places where the offset between the two
+    texts changes (collapsed whitespace, stripped markup, casefold length
+    changes) need an entry.
+    """
+
+    def __init__(self, norm: array | None = None, orig: array | None = None):
+        self.norm = norm if norm is not None else array("q")
+        self.orig = orig if orig is not None else array("q")
+
+    def add(self, norm_offset: int, orig_offset: int) -> None:
+        if self.norm and self.norm[-1] == norm_offset:
+            self.orig[-1] = orig_offset
+        elif self.norm and orig_offset - norm_offset == self.orig[-1] - self.norm[-1]:
+            return  # the previous breakpoint already maps this linearly
+        else:
+            self.norm.append(norm_offset)
+            self.orig.append(orig_offset)
+
+    def to_original(self, norm_offset: int) -> int:
+        i = bisect_right(self.norm, norm_offset) - 1
+        if i < 0:
+            return norm_offset
+        return self.orig[i] + (norm_offset - self.norm[i])
+
+
+class TextNormalizer:
+    """
+    Streaming text normalization: Unicode casefold, whitespace collapse and
+    markdown markup stripping. `feed` chunks in order; it returns the
+    normalized text for that chunk and extends `offsets`.
+    """
+
+    def __init__(self):
+        self.offsets = OffsetMap()
+        self._orig_pos = 0
+        self._norm_pos = 0
+        self._last_was_space = True  # also drops leading whitespace
+
+    def _emit_segment(self, seg: str, orig_start: int, out: list[str]) -> None:
+        folded = seg.casefold()
+        if len(folded) == len(seg):
+            self.offsets.add(self._norm_pos, orig_start)
+            out.append(folded)
+            self._norm_pos += len(folded)
+            return
+        # rare: casefold changed the length (e.g. "ß" -> "ss"); map char by char
+        for i, ch in enumerate(seg):
+            f = ch.casefold()
+            self.offsets.add(self._norm_pos, orig_start + i)
+            out.append(f)
+            self._norm_pos += len(f)
+
+    def feed(self, text: str) -> str:
+        out: list[str] = []
+        pos = 0
+        for m in _JUNK_RUN.finditer(text):
+            if m.start() > pos:
+                self._emit_segment(text[pos : m.start()], self._orig_pos + pos, out)
+                self._last_was_space = False
+            if _HAS_SPACE.search(m.group()) and not self._last_was_space:
+                self.offsets.add(self._norm_pos, self._orig_pos + m.start())
+                out.append(" ")
+                self._norm_pos += 1
+                self._last_was_space = True
+            pos = m.end()
+        if pos < len(text):
+            self._emit_segment(text[pos:], self._orig_pos + pos, out)
+            self._last_was_space = False
+
+        self._orig_pos += len(text)
+        return "".join(out)
+
+
+def normalize_text(text: str) -> str:
+    return TextNormalizer().feed(text)
+
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from bisect import bisect_right
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from itertools import accumulate
+from typing import Iterable, Mapping
+
+from app.model import Contract
+from app.services.scanner import REGEX_WINDOW, ScanResult, StreamingScanner, compile_clause_type, scan_contract_text
+from app.storage import StorageRegistry
+
+DELTA_FORMAT = 1
+
+# every Nth revision of a chain is stored in full, which bounds the number of
+# deltas applied to rebuild any revision
+DEFAULT_SNAPSHOT_EVERY = 10
+
+
+@dataclass(frozen=True)
+class TextDiff:
+    """
+    Line-level diff of a revision against its parent, in character offsets.
+
+    ops:     ("c", start, end) copies parent[start:end], ("i", text) inserts text
+    equal:   (parent_start, new_start, length) blocks present in both, in order
+    changed: [start, end) ranges of the new text that differ from the parent;
+             a pure deletion is an empty range at the junction
+    """
+
+    ops: list[tuple]
+    equal: list[tuple[int, int, int]]
+    changed: list[tuple[int, int]]
+
+    def map_span(self, start: int, end: int) -> tuple[int, int] | None:
+        """Parent span -> new-text span, if it lies entirely within unchanged text."""
+        i = bisect_right(self.equal, (start, float("inf"))) - 1
+        if i < 0:
+            return None
+        old, new, length = self.equal[i]
+        if end > old + length:
+            return None
+        return new + (start - old), new + (end - old)
+
+
+def _line_starts(lines: list[str]) -> list[int]:
+    return [0, *accumulate(len(line) for line in lines)]
+
+
+def diff_texts(old: str, new: str) -> TextDiff:
+    a = old.splitlines(keepends=True)
+    b = new.splitlines(keepends=True)
+    a_at, b_at = _line_starts(a), _line_starts(b)
+
+    ops: list[tuple] = []
+    equal: list[tuple[int, int, int]] = []
+    changed: list[tuple[int, int]] = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, a, b).get_opcodes():
+        if tag == "equal":
+            ops.append(("c", a_at[i1], a_at[i2]))
+            equal.append((a_at[i1], b_at[j1], a_at[i2] - a_at[i1]))
+        else:
+            if j2 > j1:
+                ops.append(("i", new[b_at[j1] : b_at[j2]]))
+            changed.append((b_at[j1], b_at[j2]))
+    return TextDiff(ops=ops, equal=equal, changed=changed)
+
+
+def encode_delta(diff: TextDiff, base_sha256: str) -> bytes:
+    return json.dumps(
+        {"format": DELTA_FORMAT, "base_sha256": base_sha256, "ops": diff.ops},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def apply_delta(base: str, data: bytes) -> str:
+    delta = json.loads(data)
+    if delta.get("format") != DELTA_FORMAT:
+        raise ValueError(f"unsupported delta format: {delta.get('format')!r}")
+    out: list[str] = []
+    for op in delta["ops"]:
+        if op[0] == "c":
+            out.append(base[op[1] : op[2]])
+        else:
+            out.append(op[1])
+    return "".join(out)
+
+
+def store_as_delta(delta_bytes: int, full_bytes: int, depth: int, snapshot_every: int) -> bool:
+    """
+    `depth`: deltas between the parent and its nearest full snapshot.
+    A delta is only worth it while it is clearly smaller than the text.
+    """
+    return depth + 1 < snapshot_every and delta_bytes * 2 < full_bytes
+
+
+@dataclass(frozen=True)
+class StoredText:
+    """Where one link of a revision chain is stored, read out of its Contract row."""
+
+    contract_id: int
+    storage_backend: str
+    storage_key: str
+    sha256_hex: str
+
+
+def _read_object(storage: StorageRegistry, obj: StoredText) -> bytes:
+    with storage.get(obj.storage_backend).open(obj.storage_key) as fh:
+        return fh.read()
+
+
+def revision_chain(session, contract) -> list[StoredText]:
+    """
+    Objects needed to rebuild a contract's text: the nearest full snapshot up
+    the chain first, then each delta down to `contract`.
+
+    Only plain values are returned, so the caller can end its transaction
+    before `rebuild_revision_text` reads storage.
+    """
+    chain = []
+    c = contract
+    while True:
+        chain.append(StoredText(c.id, c.storage_backend, c.storage_key, c.sha256_hex))
+        if c.storage_kind != "delta":
+            break
+        c = session.get(Contract, c.parent_id)
+    chain.reverse()
+    return chain
+
+
+def rebuild_revision_text(chain: list[StoredText], storage: StorageRegistry) -> tuple[str, int]:
+    """
+    Returns (text, depth), depth being the number of deltas applied. Each
+    step is checked against the revision's recorded sha256.
+    """
+    snapshot, deltas = chain[0], chain[1:]
+    text = _read_object(storage, snapshot).decode("utf-8")
+    for obj in deltas:
+        text = apply_delta(text, _read_object(storage, obj))
+        if hashlib.sha256(text.encode("utf-8")).hexdigest() != obj.sha256_hex:
+            raise ValueError(f"contract {obj.contract_id}: rebuilt text does not match its sha256")
+    return text, len(deltas)
+
+
+def load_revision_text(session, contract, storage: StorageRegistry) -> tuple[str, int]:
+    """Text of a contract, rebuilt from the nearest full snapshot up the chain."""
+    return rebuild_revision_text(revision_chain(session, contract), storage)
+
+
+@dataclass(frozen=True)
+class RevisionScan:
+    results: list[ScanResult]
+    carried: int  # detections taken over from the parent without scanning
+    full_scans: int  # clause types that needed a scan of the whole text
+    scanned_chars: int
+
+
+def _edit_windows(changed: list[tuple[int, int]], text_len: int, margin: int) -> list[tuple[int, int, list]]:
+    """Edited ranges widened by `margin`; overlapping windows are merged."""
+    windows: list[tuple[int, int, list]] = []
+    for start, end in changed:
+        lo, hi = max(0, start - margin), min(text_len, end + margin)
+        if windows and lo <= windows[-1][1]:
+            prev_lo, prev_hi, edits = windows[-1]
+            windows[-1] = (prev_lo, max(prev_hi, hi), edits + [(start, end)])
+        else:
+            windows.append((lo, hi, [(start, end)]))
+    return windows
+
+
+def rescan_revision(
+    text: str,
+    diff: TextDiff,
+    clause_types: Iterable,
+    parent_cells: Mapping[int, object],
+    *,
+    margin: int = REGEX_WINDOW,
+) -> RevisionScan:
+    """
+    Detection for a new revision that reuses the parent's results.
+
+    `parent_cells` maps clause_type_id -> the parent's ContractClause. For a
+    clause type whose patterns are unchanged since the parent was scanned:
+
+    - detected, with evidence in unchanged text: carried over, evidence moved
+    - not detected: a new match has to touch an edit, so only the edited
+      ranges plus `margin` characters either side are scanned, and only
+      matches touching an edit count
+
+    Anything else (new clause types, edited patterns, evidence inside an
+    edit) is scanned over the whole revision.
+    """
+    clause_types = [compile_clause_type(ct) for ct in clause_types]
+    digests = {ct.id: ct.digest for ct in clause_types}
+    found: dict[int, ScanResult] = {}
+    windowed, full = [], []
+    carried = 0
+
+    for ct in clause_types:
+        cell = parent_cells.get(ct.id)
+        if cell is None or cell.patterns_digest != digests[ct.id]:
+            full.append(ct)
+        elif not cell.detected:
+            windowed.append(ct)
+        else:
+            span = None
+            if cell.evidence_start is not None and cell.evidence_end is not None:
+                span = diff.map_span(cell.evidence_start, cell.evidence_end)
+            if span is None:
+                full.append(ct)
+            else:
+                found[ct.id] = ScanResult(ct.id, True, span, digests[ct.id])
+                carried += 1
+
+    scanned = 0
+    for lo, hi, edits in _edit_windows(diff.changed, len(text), margin) if windowed else ():
+        pending = [ct for ct in windowed if ct.id not in found]
+        if not pending:
+            break
+        local = [(start - lo, end - lo) for start, end in edits]
+        scanner = StreamingScanner(
+            pending,
+            accept=lambda s, e, local=local: any(s <= end and e >= start for start, end in local),
+        )
+        scanner.feed(text[lo:hi])
+        scanned += hi - lo
+        for r in scanner.results():
+            if r.detected:
+                s, e = r.evidence
+                found[r.clause_type_id] = ScanResult(r.clause_type_id, True, (s + lo, e + lo), r.patterns_digest)
+
+    if full:
+        found.update((r.clause_type_id, r) for r in scan_contract_text(text, full))
+        scanned += len(text)
+
+    return RevisionScan(
+        results=[found.get(ct.id) or ScanResult(ct.id, False, None, digests[ct.id]) for ct in clause_types],
+        carried=carried,
+        full_scans=len(full),
+        scanned_chars=scanned,
+    )
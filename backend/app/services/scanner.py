@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import re
 from dataclasses import dataclass
-from typing import Iterable
+from typing import Callable, Iterable, Iterator, Mapping
 
+from app.services.normalize import OffsetMap, TextNormalizer, normalize_text
 
 
 REGEX_FLAGS = re.IGNORECASE
@@ -13,25 +16,290 @@ REGEX_FLAGS = re.IGNORECASE
 class ScanResult:
     clause_type_id: int
     detected: bool
+    # [start, end) of the first match, in characters of the original text
+    evidence: tuple[int, int] | None = None
+    # identifies the pattern set that produced this result (see patterns_digest)
+    patterns_digest: str | None = None
 
 
-def _detect_clause(contract_text: str, patterns) -> bool:
+# Regex matches up to this many characters long are found even when they span
+# a chunk boundary; longer ones are only found within a single chunk.
+REGEX_WINDOW = 8 * 1024
+
+
+_WORD = re.compile(r"\w")
+
+
+def compile_keyword(keyword: str) -> re.Pattern | None:
     """
-    Return True if any pattern matches the contract text.
+    Keyword -> regex over normalized text, anchored at token boundaries
+    ("term" does not match inside "determine"). Boundaries are only required
+    on sides where the keyword itself starts/ends with a word character.
 
-    patterns: iterable of objects with attributes:
-      - pattern: str
-      - is_regex: bool
+    The pattern starts with the literal so `re` can skip ahead with its
+    prefix search; the left boundary is checked by `keyword_matches`.
     """
-    hay_lower = contract_text.lower()
-    for p in patterns:
-        if p.is_regex:
-            if re.search(p.pattern, contract_text, flags=REGEX_FLAGS):
-                return True
+    norm = normalize_text(keyword).strip()
+    if not norm:
+        return None
+    right = r"(?!\w)" if norm[-1].isalnum() else ""
+    return re.compile(re.escape(norm) + right)
+
+
+def keyword_matches(pattern: re.Pattern, text: str, pos: int = 0) -> Iterator[re.Match]:
+    """`pattern.finditer` for compile_keyword patterns, skipping matches that start inside a word."""
+    m = pattern.search(text, pos)
+    while m is not None:
+        start = m.start()
+        if start > 0 and text[start].isalnum() and _WORD.match(text, start - 1):
+            m = pattern.search(text, start + 1)
         else:
-            if p.pattern.lower() in hay_lower:
-                return True
-    return False
+            yield m
+            m = pattern.search(text, m.end())
+
+
+def _digest(patterns: Iterable[tuple[str, bool]]) -> str:
+    items = sorted({(bool(is_regex), pattern) for pattern, is_regex in patterns})
+    return hashlib.sha1(json.dumps(items).encode("utf-8")).hexdigest()[:16]
+
+
+def patterns_digest(clause_type) -> str:
+    """Short stable fingerprint of a clause type's patterns (order-insensitive)."""
+    if isinstance(clause_type, CompiledClauseType):
+        return clause_type.digest
+    return _digest((p.pattern, p.is_regex) for p in clause_type.patterns or ())
+
+
+def compile_pattern(pattern: str, is_regex: bool) -> re.Pattern | None:
+    """None for keywords that normalize to nothing (e.g. only markup)."""
+    if is_regex:
+        return re.compile(pattern, REGEX_FLAGS)
+    return compile_keyword(pattern)
+
+
+@dataclass(frozen=True)
+class CompiledClauseType:
+    """One clause type's patterns, compiled for the scanner."""
+
+    id: int
+    keywords: tuple[re.Pattern, ...]
+    regexes: tuple[re.Pattern, ...]
+    digest: str
+    # stored regexes that don't compile (saved before regexes were validated);
+    # scanning with this clause type fails with the first one
+    invalid: tuple[re.error, ...] = ()
+
+    @classmethod
+    def from_compiled(cls, clause_type_id: int, compiled: Mapping[tuple[str, bool], re.Pattern | re.error | None]):
+        """`compiled`: (pattern, is_regex) -> compile_pattern result, or the re.error it raised."""
+        keys = sorted(compiled)
+        valid = [k for k in keys if not isinstance(compiled[k], re.error)]
+        return cls(
+            id=clause_type_id,
+            keywords=tuple(compiled[k] for k in valid if not k[1] and compiled[k] is not None),
+            regexes=tuple(compiled[k] for k in valid if k[1]),
+            digest=_digest(keys),
+            invalid=tuple(compiled[k] for k in keys if isinstance(compiled[k], re.error)),
+        )
+
+
+def compile_clause_type(clause_type) -> CompiledClauseType:
+    """Accepts anything with id + patterns (pattern/is_regex); compiled input is passed through."""
+    if isinstance(clause_type, CompiledClauseType):
+        return clause_type
+    compiled = {}
+    for p in clause_type.patterns or ():
+        key = (p.pattern, bool(p.is_regex))
+        if key not in compiled:
+            compiled[key] = compile_pattern(*key)
+    return CompiledClauseType.from_compiled(clause_type.id, compiled)
+
+
+# accept(start, end) -> bool, in original-text characters
+MatchFilter = Callable[[int, int], bool]
+
+
+class StreamingScanner:
+    """
+    Incremental scanner over two views of the same text:
+
+    - keywords are matched on normalized text (casefolded, whitespace
+      collapsed, markdown markup stripped) at token boundaries
+    - regexes are matched on the original text
+
+    Clause types are taken as-is if already compiled (CompiledClauseType,
+    e.g. from the shared ClauseLibrary), otherwise compiled here.
+
+    Use `feed(text)` for raw chunks, or `feed_raw` / `feed_normalized`
+    separately when the caller normalizes itself (the ingest pipeline).
+    Consecutive chunks are scanned with an overlap (the longest keyword, or
+    REGEX_WINDOW for regexes), so matches straddling a boundary are still
+    found. A clause type stops being checked as soon as it is detected; its
+    first match is kept as evidence.
+
+    `offsets` maps normalized offsets back to the original text when the
+    normalized text is fed separately (`feed` uses its own normalizer).
+    `accept` optionally restricts which matches count, e.g. to those
+    touching an edited region.
+    """
+
+    def __init__(self, clause_types: Iterable, *, offsets: OffsetMap | None = None, accept: MatchFilter | None = None):
+        self._order: list[int] = []
+        self._digests: dict[int, str] = {}
+        self._keywords: dict[int, list[re.Pattern]] = {}
+        self._regexes: dict[int, list[re.Pattern]] = {}
+        longest_keyword = 0
+
+        for ct in map(compile_clause_type, clause_types):
+            if ct.invalid:
+                e = ct.invalid[0]
+                raise re.error(f"clause type {ct.id}: invalid regex {e.pattern!r}: {e.msg}")
+            self._order.append(ct.id)
+            self._digests[ct.id] = ct.digest
+            if ct.keywords:
+                self._keywords[ct.id] = list(ct.keywords)
+                longest_keyword = max(longest_keyword, *(len(k.pattern) for k in ct.keywords))
+            if ct.regexes:
+                self._regexes[ct.id] = list(ct.regexes)
+
+        # longest match checked across chunks, per view (a keyword's regex
+        # source is at least as long as anything it matches)
+        self._norm_overlap = longest_keyword
+        self._raw_overlap = REGEX_WINDOW
+        # carried-over end of the previous window, and where scanning resumes in it
+        self._norm_tail: tuple[str, int] | None = None  # None until the first chunk
+        self._raw_tail: tuple[str, int] | None = None
+        self._norm_seen = 0  # characters fed so far, per view
+        self._raw_seen = 0
+        self._normalizer: TextNormalizer | None = None
+        self._offsets = offsets if offsets is not None else OffsetMap()
+        self._accept = accept
+        self._evidence: dict[int, tuple[int, int]] = {}
+        self._finished = False
+
+    @property
+    def needs_raw(self) -> bool:
+        return bool(self._regexes)
+
+    @property
+    def needs_normalized(self) -> bool:
+        return bool(self._keywords)
+
+    @property
+    def done(self) -> bool:
+        return not self._keywords and not self._regexes
+
+    def _hit(self, ct_id: int, span: tuple[int, int]) -> None:
+        self._evidence[ct_id] = span
+        self._keywords.pop(ct_id, None)
+        self._regexes.pop(ct_id, None)
+
+    def _norm_span(self, start: int, end: int) -> tuple[int, int]:
+        return self._offsets.to_original(start), self._offsets.to_original(end - 1) + 1
+
+    def _search(self, matches: Iterator[re.Match], window: str, final: bool, base: int, to_span) -> tuple[int, int] | None:
+        for m in matches:
+            # A match touching the window end may continue into the next chunk (or
+            # fail a lookahead there); it stays in the carried-over tail instead.
+            if not final and m.end() >= len(window):
+                continue
+            span = to_span(base + m.start(), base + m.end())
+            if self._accept is None or self._accept(*span):
+                return span
+        return None
+
+    def _scan(
+        self,
+        pending: dict[int, list[re.Pattern]],
+        tail: tuple[str, int] | None,
+        seen: int,
+        text: str,
+        overlap: int,
+        final: bool,
+        to_span,
+        finditer,
+    ) -> tuple[str, int]:
+        if tail is None:
+            window, pos = text, 0
+            base = seen
+        else:
+            window, pos = tail[0] + text, tail[1]
+            base = seen - len(tail[0])  # offset of window[0] in the whole text
+
+        for ct_id, patterns in list(pending.items()):
+            if ct_id in self._evidence:
+                continue
+            for p in patterns:
+                span = self._search(finditer(p, window, pos), window, final, base, to_span)
+                if span is not None:
+                    self._hit(ct_id, span)
+                    break
+
+        # Matches of up to `overlap` characters starting before `resume` lay
+        # inside this window and were checked; from `resume` on (held-back
+        # matches included) everything is checked again with the next chunk.
+        # One character before it is kept so lookbehinds and the keyword left
+        # boundary see their context.
+        resume = max(pos, len(window) - overlap)
+        keep = max(0, resume - 1)
+        return window[keep:], resume - keep
+
+    def feed_normalized(self, text: str, *, final: bool = False) -> None:
+        if self._keywords and (text or final):
+            self._norm_tail = self._scan(
+                self._keywords,
+                self._norm_tail,
+                self._norm_seen,
+                text,
+                self._norm_overlap,
+                final,
+                self._norm_span,
+                keyword_matches,
+            )
+        self._norm_seen += len(text)
+
+    def feed_raw(self, text: str, *, final: bool = False) -> None:
+        if self._regexes and (text or final):
+            self._raw_tail = self._scan(
+                self._regexes,
+                self._raw_tail,
+                self._raw_seen,
+                text,
+                self._raw_overlap,
+                final,
+                lambda s, e: (s, e),
+                re.Pattern.finditer,
+            )
+        self._raw_seen += len(text)
+
+    def feed(self, text: str) -> None:
+        if self.done or not text:
+            return
+        if self._keywords:
+            if self._normalizer is None:
+                self._normalizer = TextNormalizer()
+                self._offsets = self._normalizer.offsets
+            self.feed_normalized(self._normalizer.feed(text))
+        self.feed_raw(text)
+
+    def finish(self) -> None:
+        """Check matches held back at the very end of the text."""
+        if not self._finished:
+            self._finished = True
+            self.feed_normalized("", final=True)
+            self.feed_raw("", final=True)
+
+    def results(self) -> list[ScanResult]:
+        self.finish()
+        return [
+            ScanResult(
+                clause_type_id=ct_id,
+                detected=ct_id in self._evidence,
+                evidence=self._evidence.get(ct_id),
+                patterns_digest=self._digests[ct_id],
+            )
+            for ct_id in self._order
+        ]
 
 
 def scan_contract_text(contract_text: str, clause_types: Iterable) -> list[ScanResult]:
@@ -42,8 +310,6 @@ def scan_contract_text(contract_text: str, clause_types: Iterable) -> list[ScanR
       - id: int
       - patterns: iterable (each has pattern/is_regex)
     """
-    results: list[ScanResult] = []
-    for ct in clause_types:
-        detected = _detect_clause(contract_text, ct.patterns) if ct.patterns else False
-        results.append(ScanResult(clause_type_id=ct.id, detected=detected))
-    return results
+    scanner = StreamingScanner(clause_types)
+    scanner.feed(contract_text)
+    return scanner.results()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Protocol
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    backend: str
+    key: str
+    size_bytes: int
+    sha256_hex: str
+
+
+class ContractStorage(Protocol):
+    """
+    Interface every storage backend implements.
+
+    Keys are opaque, immutable and unique per stored object; the backend name is
+    persisted on `Contract.storage_backend` so reads can be routed back to it.
+    """
+
+    backend: str
+
+    def save(self, stream: BinaryIO, *, original_filename: str, first_chunk: bytes = b"") -> StoredObject: ...
+
+    def open(self, key: str) -> BinaryIO: ...
+
+    def delete(self, key: str) -> None: ...
+
+
+StorageFactory = Callable[[], ContractStorage]
+
+_FACTORIES: dict[str, StorageFactory] = {}
+
+
+def register_backend(name: str):
+    """Register a zero-argument factory (configured from env) under a backend name."""
+
+    def decorator(factory: StorageFactory) -> StorageFactory:
+        _FACTORIES[name] = factory
+        return factory
+
+    return decorator
+
+
+def create_storage(name: str) -> ContractStorage:
+    # backend modules register themselves on import
+    import app.storage_local  # noqa: F401
+    import app.storage_s3  # noqa: F401
+
+    try:
+        factory = _FACTORIES[name]
+    except KeyError:
+        raise RuntimeError(f"unknown storage backend: {name!r}") from None
+    return factory()
+
+
+class StorageRegistry:
+    """
+    Holds one instance per backend for the lifetime of the process.
+
+    New uploads go to `default`; existing contracts are read through
+    `get(contract.storage_backend)`, so files written before a backend switch
+    stay readable.
+    """
+
+    def __init__(self, default: ContractStorage):
+        self.default = default
+        self._instances: dict[str, ContractStorage] = {default.backend: default}
+        self._lock = threading.Lock()
+
+    def get(self, backend: str) -> ContractStorage:
+        inst = self._instances.get(backend)
+        if inst is not None:
+            return inst
+        with self._lock:
+            inst = self._instances.get(backend)
+            if inst is None:
+                inst = create_storage(backend)
+                self._instances[backend] = inst
+            return inst
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO
+from uuid import uuid4
+
+from app.storage import ContractStorage, StoredObject
+
+
+class _TeeReader:
+    """Read-through wrapper that copies every chunk it returns into `sink`."""
+
+    def __init__(self, stream: BinaryIO, sink: BinaryIO):
+        self._stream = stream
+        self._sink = sink
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._stream.read(size)
+        if chunk:
+            self._sink.write(chunk)
+        return chunk
+
+
+class CachedStorage:
+    """
+    Read-through local disk cache in front of a remote backend.
+
+    Objects are immutable once stored, so cache entries never need
+    invalidation; the cache is bounded by `max_bytes` and evicts the least
+    recently used files. Uploads are written through so the first scan of a
+    fresh contract does not need a remote GET either.
+    """
+
+    def __init__(self, inner: ContractStorage, cache_dir: str, *, max_bytes: int):
+        self.inner = inner
+        self.backend = inner.backend
+        self.max_bytes = max_bytes
+        self.cache_dir = Path(cache_dir).resolve()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, int] = OrderedDict()  # key -> size, oldest first
+        self._total = 0
+        self._load_existing()
+
+    def _load_existing(self) -> None:
+        files = [p for p in self.cache_dir.iterdir() if p.is_file() and not p.name.startswith(".tmp-")]
+        for p in sorted(files, key=lambda p: p.stat().st_mtime):
+            size = p.stat().st_size
+            self._entries[p.name] = size
+            self._total += size
+        with self._lock:
+            self._evict()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key
+
+    def _tmp_path(self) -> Path:
+        return self.cache_dir / f".tmp-{uuid4().hex}"
+
+    def _touch(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        try:
+            os.utime(self._path(key))  # keeps recency across restarts
+        except FileNotFoundError:
+            pass
+
+    def _admit(self, key: str, tmp: Path) -> None:
+        size = tmp.stat().st_size
+        if size > self.max_bytes:
+            tmp.unlink(missing_ok=True)
+            return
+        os.replace(tmp, self._path(key))
+        with self._lock:
+            self._total -= self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._total += size
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total -= size
+            self._path(key).unlink(missing_ok=True)
+
+    def _forget(self, key: str) -> None:
+        with self._lock:
+            self._total -= self._entries.pop(key, 0)
+        self._path(key).unlink(missing_ok=True)
+
+    def save(self, stream: BinaryIO, *, original_filename: str, first_chunk: bytes = b"") -> StoredObject:
+        tmp = self._tmp_path()
+        try:
+            with open(tmp, "wb") as sink:
+                sink.write(first_chunk)
+                stored = self.inner.save(
+                    _TeeReader(stream, sink),
+                    original_filename=original_filename,
+                    first_chunk=first_chunk,
+                )
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+        self._admit(stored.key, tmp)
+        return stored
+
+    def open(self, key: str) -> BinaryIO:
+        try:
+            fh = open(self._path(key), "rb")
+        except FileNotFoundError:
+            pass
+        else:
+            self._touch(key)
+            return fh
+
+        tmp = self._tmp_path()
+        try:
+            with self.inner.open(key) as src, open(tmp, "wb") as out:
+                while True:
+                    chunk = src.read(1024 * 1024)  # 1MB
+                    if not chunk:
+                        break
+                    out.write(chunk)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+        # Open before admitting: eviction by a concurrent admit can't pull the
+        # file out from under this reader once the descriptor exists.
+        fh = open(tmp, "rb")
+        self._admit(key, tmp)
+        return fh
+
+    def delete(self, key: str) -> None:
+        self._forget(key)
+        self.inner.delete(key)
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import zlib
+from typing import BinaryIO
+
+from app.storage import ContractStorage, StoredObject
+
+READ_CHUNK_BYTES = 1024 * 1024  # 1MB
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# key suffix -> codec; reads pick the codec from the key, so objects stay
+# readable after the configured codec changes
+CODEC_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def _compressor(codec: str):
+    """Object with compress(data) -> bytes and flush() -> bytes (ends the frame)."""
+    if codec == "gzip":
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    if codec == "zstd":
+        from compression import zstd  # Python 3.14+
+
+        return zstd.ZstdCompressor(level=ZSTD_LEVEL)
+    raise ValueError(f"unknown compression codec: {codec!r}")
+
+
+def _require_codec(codec: str) -> None:
+    """Fail when the backend is built (app startup), not on the first upload."""
+    if codec == "zstd":
+        try:
+            from compression import zstd  # noqa: F401
+        except ImportError:
+            raise RuntimeError("zstd compression requires Python 3.14+ (compression.zstd); use gzip") from None
+
+
+def _decompressing_file(codec: str, raw: BinaryIO) -> BinaryIO:
+    if codec == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    from compression import zstd
+
+    return zstd.ZstdFile(raw, "rb")
+
+
+def _codec_for_key(key: str) -> str | None:
+    for codec, suffix in CODEC_SUFFIXES.items():
+        if key.endswith(suffix):
+            return codec
+    return None
+
+
+class _CompressingReader:
+    """
+    Read-side adapter for `inner.save`: pulls original bytes from `stream`,
+    hashes and counts them, and hands out the compressed frame.
+    """
+
+    def __init__(self, stream: BinaryIO, codec: str, first_chunk: bytes):
+        self._stream = stream
+        self._compressor = _compressor(codec)
+        self._pending = first_chunk
+        self._buf = bytearray()
+        self._eof = False
+        self.sha = hashlib.sha256()
+        self.size = 0
+
+    def _pull(self) -> None:
+        chunk, self._pending = self._pending or self._stream.read(READ_CHUNK_BYTES), b""
+        if chunk:
+            self.sha.update(chunk)
+            self.size += len(chunk)
+            self._buf += self._compressor.compress(chunk)
+        else:
+            self._buf += self._compressor.flush()
+            self._eof = True
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buf) < size):
+            self._pull()
+        n = len(self._buf) if size < 0 else size
+        out = bytes(self._buf[:n])
+        del self._buf[:n]
+        return out
+
+
+class _DecompressingStream:
+    """Decompresses while reading; closing it also closes the underlying object."""
+
+    def __init__(self, codec: str, raw: BinaryIO):
+        self._raw = raw
+        self._file = _decompressing_file(codec, raw)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def close(self) -> None:
+        try:
+            self._file.close()
+        finally:
+            self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class CompressedStorage:
+    """
+    Transparent compression in front of any backend.
+
+    `save` compresses while streaming (one gzip or zstd frame per object,
+    nothing buffered beyond a chunk); `size_bytes` and `sha256_hex` still
+    describe the original bytes. The codec is recorded as a key suffix, and
+    `open` decompresses on the fly, so readers (scanner, revisions) always see
+    the original text. With `codec=None` new objects are stored as-is but
+    compressed ones remain readable.
+    """
+
+    def __init__(self, inner: ContractStorage, codec: str | None):
+        if codec is not None and codec not in CODEC_SUFFIXES:
+            raise ValueError(f"unknown compression codec: {codec!r} (expected one of {sorted(CODEC_SUFFIXES)})")
+        if codec is not None:
+            _require_codec(codec)
+        self.inner = inner
+        self.backend = inner.backend
+        self.codec = codec
+
+    def save(self, stream: BinaryIO, *, original_filename: str, first_chunk: bytes = b"") -> StoredObject:
+        if self.codec is None:
+            return self.inner.save(stream, original_filename=original_filename, first_chunk=first_chunk)
+
+        reader = _CompressingReader(stream, self.codec, first_chunk)
+        stored = self.inner.save(reader, original_filename=original_filename + CODEC_SUFFIXES[self.codec])
+        return StoredObject(stored.backend, stored.key, reader.size, reader.sha.hexdigest())
+
+    def open(self, key: str) -> BinaryIO:
+        codec = _codec_for_key(key)
+        if codec is None:
+            return self.inner.open(key)
+        return _DecompressingStream(codec, self.inner.open(key))
+
+    def delete(self, key: str) -> None:
+        self.inner.delete(key)
+
+
+def compression_from_env(value: str | None) -> str | None:
+    """Env value ("", "none", "gzip", "zstd") -> codec name or None."""
+    value = (value or "").strip().lower()
+    return None if value in ("", "none") else value
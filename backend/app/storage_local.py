@@ -2,18 +2,13 @@ from __future__ import annotations
 
 import hashlib
 import os
-from dataclasses import dataclass
 from pathlib import Path
 from typing import BinaryIO
 from uuid import uuid4
 
+from app.storage import StoredObject, register_backend
 
-@dataclass(frozen=True)
-class StoredObject:
-    backend: str
-    key: str
-    size_bytes: int
-    sha256_hex: str
+__all__ = ["LocalFileStorage", "StoredObject"]
 
 
 class LocalFileStorage:
@@ -32,21 +27,38 @@ class LocalFileStorage:
         sha = hashlib.sha256()
         size = 0
 
-        with open(dest, "wb") as out:
-            if first_chunk:
-                out.write(first_chunk)
-                sha.update(first_chunk)
-                size += len(first_chunk)
+        try:
+            with open(dest, "wb") as out:
+                if first_chunk:
+                    out.write(first_chunk)
+                    sha.update(first_chunk)
+                    size += len(first_chunk)
 
-            while True:
-                chunk = stream.read(1024 * 1024)  # 1MB
-                if not chunk:
-                    break
-                out.write(chunk)
-                sha.update(chunk)
-                size += len(chunk)
+                while True:
+                    chunk = stream.read(1024 * 1024)  # 1MB
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                    sha.update(chunk)
+                    size += len(chunk)
+        except BaseException:
+            dest.unlink(missing_ok=True)  # never leave a partial file behind
+            raise
 
         return StoredObject(self.backend, key, size, sha.hexdigest())
 
     def open(self, key: str) -> BinaryIO:
         return open(self.base_dir / key, "rb")
+
+    def delete(self, key: str) -> None:
+        (self.base_dir / key).unlink(missing_ok=True)
+
+
+@register_backend("local")
+def _local_from_env():
+    from app.storage_compression import CompressedStorage, compression_from_env
+
+    return CompressedStorage(
+        LocalFileStorage(os.getenv("CONTRACT_STORAGE_DIR", "./data/contracts")),
+        compression_from_env(os.getenv("CONTRACT_STORAGE_COMPRESSION")),
+    )
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import BinaryIO
+from uuid import uuid4
+
+from app.storage import StoredObject, register_backend
+
+# S3 requires every part except the last one to be at least 5 MiB.
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+
+def _make_client(*, endpoint_url: str | None, region: str | None, max_pool_connections: int):
+    try:
+        import boto3
+        from botocore.config import Config
+    except ImportError:  # optional dependency
+        raise RuntimeError("the s3 storage backend requires boto3 (install the 's3' extra)") from None
+
+    # One client per process: it is thread-safe and keeps a pool of keep-alive
+    # HTTP connections, so uploads and reads don't pay a TLS handshake each.
+    config = Config(
+        max_pool_connections=max_pool_connections,
+        retries={"max_attempts": 5, "mode": "standard"},
+        s3={"addressing_style": "path"} if endpoint_url else None,
+    )
+    return boto3.client("s3", endpoint_url=endpoint_url, region_name=region, config=config)
+
+
+class S3Storage:
+    """
+    S3-compatible object storage (AWS S3, MinIO, ...).
+
+    Uploads are streamed as multipart uploads so the body is never held in
+    memory.
+    """
+
+    backend = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        *,
+        client=None,
+        prefix: str = "contracts/",
+        part_size: int = DEFAULT_PART_SIZE,
+        endpoint_url: str | None = None,
+        region: str | None = None,
+        max_pool_connections: int = 20,
+    ):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be >= {MIN_PART_SIZE}")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.part_size = part_size
+        self.client = client or _make_client(
+            endpoint_url=endpoint_url,
+            region=region,
+            max_pool_connections=max_pool_connections,
+        )
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def save(self, stream: BinaryIO, *, original_filename: str, first_chunk: bytes = b"") -> StoredObject:
+        _, ext = os.path.splitext(original_filename or "")
+        ext = (ext[:10] if ext else "")  # guard weirdly long extensions
+        key = f"{uuid4().hex}{ext}"
+        obj_key = self._object_key(key)
+
+        sha = hashlib.sha256()
+        size = 0
+        buf = bytearray(first_chunk)
+
+        def fill() -> bool:
+            """Read until one part is buffered; False once the stream is drained."""
+            while len(buf) < self.part_size:
+                chunk = stream.read(1024 * 1024)  # 1MB
+                if not chunk:
+                    return False
+                buf.extend(chunk)
+            return True
+
+        more = fill()
+        if not more:
+            # small object: a single PUT is cheaper than a multipart round trip
+            body = bytes(buf)
+            sha.update(body)
+            self.client.put_object(Bucket=self.bucket, Key=obj_key, Body=body)
+            return StoredObject(self.backend, key, len(body), sha.hexdigest())
+
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=obj_key)["UploadId"]
+        parts = []
+        try:
+            while True:
+                part = bytes(buf[: self.part_size])
+                del buf[: self.part_size]
+                sha.update(part)
+                size += len(part)
+
+                part_number = len(parts) + 1
+                resp = self.client.upload_part(
+                    Bucket=self.bucket,
+                    Key=obj_key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=part,
+                )
+                parts.append({"ETag": resp["ETag"], "PartNumber": part_number})
+
+                if more:
+                    more = fill()
+                if not more and not buf:
+                    break
+
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=obj_key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=obj_key, UploadId=upload_id)
+            raise
+
+        return StoredObject(self.backend, key, size, sha.hexdigest())
+
+    def open(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))["Body"]
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+
+@register_backend("s3")
+def _s3_from_env():
+    bucket = os.getenv("S3_BUCKET")
+    if not bucket:
+        raise RuntimeError("S3_BUCKET is not set")
+
+    storage = S3Storage(
+        bucket,
+        prefix=os.getenv("S3_PREFIX", "contracts/"),
+        part_size=int(os.getenv("S3_PART_SIZE_BYTES", str(DEFAULT_PART_SIZE))),
+        endpoint_url=os.getenv("S3_ENDPOINT_URL") or None,
+        region=os.getenv("S3_REGION") or None,
+        max_pool_connections=int(os.getenv("S3_MAX_POOL_CONNECTIONS", "20")),
+    )
+
+    cache_dir = os.getenv("CONTRACT_CACHE_DIR")
+    if cache_dir:
+        from app.storage_cache import CachedStorage
+
+        storage = CachedStorage(
+            storage,
+            cache_dir,
+            max_bytes=int(os.getenv("CONTRACT_CACHE_MAX_BYTES", str(1024 * 1024 * 1024))),
+        )
+
+    from app.storage_compression import CompressedStorage, compression_from_env
+
+    # outermost, so the disk cache holds compressed objects too
+    return CompressedStorage(storage, compression_from_env(os.getenv("S3_COMPRESSION")))
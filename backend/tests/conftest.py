@@ -1,9 +1,60 @@
 from __future__ import annotations
 
+import itertools
 import sys
+from dataclasses import dataclass
 from pathlib import Path
 
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
 # Ensure the backend directory (the one containing "app/") is importable as a top-level package.
 BACKEND_ROOT = Path(__file__).resolve().parents[1]
 if str(BACKEND_ROOT) not in sys.path:
     sys.path.insert(0, str(BACKEND_ROOT))
+
+from app.model import Base, ClauseType, Contract, ContractClause  # noqa: E402
+
+
+@dataclass
+class FakePattern:
+    pattern: str
+    is_regex: bool
+
+
+@dataclass
+class FakeClauseType:
+    id: int
+    patterns: list[FakePattern]
+
+
+@pytest.fixture
+def make_clause_type():
+    """Scanner-shaped clause types without a database: make_clause_type(1, ("term", False), ...)."""
+
+    def make(id: int, *patterns: tuple[str, bool]) -> FakeClauseType:
+        return FakeClauseType(id, [FakePattern(p, is_regex) for p, is_regex in patterns])
+
+    return make
+
+
+@pytest.fixture
+def matrix_session():
+    """
+    sqlite session with clause types, contracts and the matrix. sqlite supports
+    stored generated columns, so `effective` is computed by the database just
+    like in Postgres; pg_current_xact_id() is stood in for by a counter.
+    """
+    engine = create_engine("sqlite://")
+    txids = itertools.count(1000)
+
+    @event.listens_for(engine, "connect")
+    def _functions(dbapi_connection, _):
+        dbapi_connection.create_function("pg_current_xact_id", 0, lambda: next(txids))
+
+    Base.metadata.create_all(
+        engine, tables=[ClauseType.__table__, Contract.__table__, ContractClause.__table__]
+    )
+    with Session(engine) as s:
+        yield s
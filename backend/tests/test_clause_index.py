@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+from app.model import ClauseType, Contract, ContractClause
+from app.services.clause_index import ClauseBitsetIndex, Watermark
+from app.services.clause_query import ContractQueryIn
+
+
+def _index() -> ClauseBitsetIndex:
+    idx = ClauseBitsetIndex()
+    # contract 1: termination detected; contract 2: detected but confirmed missing;
+    # contract 3: not detected but confirmed present; contract 4: no rows at all
+    for cid in (1, 2, 3, 4):
+        idx.add_contract(cid)
+    idx.set_cell(1, 10, detected=True, confirmed=None)
+    idx.set_cell(2, 10, detected=True, confirmed=False)
+    idx.set_cell(3, 10, detected=False, confirmed=True)
+    idx.set_cell(1, 20, detected=True, confirmed=None)
+    return idx
+
+
+def test_row_applies_effective_rule():
+    idx = _index()
+    assert idx.row(2, [10, 20]) == {10: (True, False, False), 20: (False, None, False)}
+    assert idx.row(3, [10]) == {10: (False, True, True)}
+
+
+def test_counts_popcount_each_plane():
+    assert _index().counts([10]) == {
+        10: {"detected": 2, "confirmed_present": 1, "confirmed_missing": 1, "effective": 2}
+    }
+
+
+def test_evaluate_treats_missing_rows_as_absent():
+    idx = _index()
+    q = ContractQueryIn.model_validate(
+        {"where": {"and": [{"clause_type": "Termination"}, {"clause_type": 20, "effective": False}]}}
+    )
+    bits = idx.evaluate(q.where, {"Termination": 10, 20: 20})
+    assert idx.ids_desc(bits, limit=10) == [3]
+
+    bits = idx.evaluate(ContractQueryIn.model_validate({"where": {"not": {"clause_type": 10}}}).where, {10: 10})
+    assert idx.ids_desc(bits, limit=10) == [4, 2]
+    assert idx.ids_desc(bits, before_id=4, limit=10) == [2]
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = tmp_path / "index.bin"
+    idx = _index()
+    idx._watermark = Watermark(120, (90, 103))
+    idx.save(path)
+
+    loaded = ClauseBitsetIndex(snapshot_path=str(path))
+    assert loaded.counts([10, 20]) == _index().counts([10, 20])
+    assert loaded.contracts_bits() == _index().contracts_bits()
+    assert loaded._watermark == Watermark(120, (90, 103))
+
+
+def test_remove_contract_clears_its_row_and_membership():
+    idx = _index()
+    idx.remove_contract(2)
+    assert not idx.has_contract(2) and idx.has_contract(1)
+    assert idx.row(2, [10]) == {10: (False, None, False)}
+    assert idx.counts([10])[10] == {"detected": 1, "confirmed_present": 1, "confirmed_missing": 0, "effective": 2}
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, stmt):
+        return iter(self.rows)
+
+
+def test_reconcile_drops_contracts_deleted_elsewhere():
+    idx = _index()
+    idx._reconcile_contracts(FakeSession([(1,), (3,)]))
+
+    assert [cid for cid in (1, 2, 3, 4) if idx.has_contract(cid)] == [1, 3]
+    assert idx.counts([10])[10]["detected"] == 1
+
+
+def test_refresh_returns_without_waiting_while_another_one_runs():
+    idx = ClauseBitsetIndex(refresh_interval=0)
+
+    class Untouched:
+        def execute(self, stmt):
+            raise AssertionError("refresh should not have queried")
+
+    with idx._refresh_lock:  # e.g. the first full load, in another request
+        idx.refresh(Untouched())
+    assert not idx.loaded
+
+
+class _Snapshots:
+    """Session proxy: answers pg_current_snapshot() with `snapshot`, counts rows read."""
+
+    def __init__(self, session):
+        self._session = session
+        self.snapshot = ""
+        self.rows_read = 0
+
+    def execute(self, stmt):
+        if "pg_current_snapshot" in str(stmt):
+            return SimpleNamespace(scalar_one=lambda: self.snapshot)
+        rows = list(self._session.execute(stmt))
+        self.rows_read += len(rows)
+        return rows
+
+
+def _write(session, contract_id: int, txid: int, *, detected: bool) -> None:
+    session.merge(
+        Contract(
+            id=contract_id,
+            original_filename="c.txt",
+            storage_backend="local",
+            storage_key=f"k{contract_id}",
+            size_bytes=1,
+            sha256_hex="0" * 64,
+            change_txid=txid,
+        )
+    )
+    session.add(ContractClause(contract_id=contract_id, clause_type_id=10, detected=detected, change_txid=txid))
+    session.commit()
+
+
+def test_refresh_picks_up_late_commits_without_rereading_behind_an_old_transaction(matrix_session):
+    matrix_session.add(ClauseType(id=10, name="Termination"))
+    _write(matrix_session, 1, 100, detected=True)
+    _write(matrix_session, 2, 101, detected=False)
+    idx = ClauseBitsetIndex(refresh_interval=0)
+    session = _Snapshots(matrix_session)
+
+    session.snapshot = "100:105:103"  # txid 103 still in progress during the load
+    idx.refresh(session)
+    assert idx.loaded and idx.counts([10])[10]["detected"] == 1
+
+    _write(matrix_session, 3, 103, detected=True)  # commits late
+    _write(matrix_session, 4, 110, detected=True)
+    session.snapshot, session.rows_read = "90:120:90", 0  # txid 90 idles in a transaction
+    idx.refresh(session)
+    assert [cid for cid in (1, 2, 3, 4) if idx.has_contract(cid)] == [1, 2, 3, 4]
+    assert idx.counts([10])[10]["detected"] == 3
+    assert session.rows_read == 4  # contracts 3 and 4 with their cells
+
+    session.snapshot, session.rows_read = "90:121:90", 0
+    idx.refresh(session)
+    assert session.rows_read == 0  # nothing since, however old txid 90 gets
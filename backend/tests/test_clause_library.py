@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import io
+import re
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.model import Base, ClausePattern, ClauseType
+from app.services.clause_index import ClauseBitsetIndex
+from app.services.clause_library import ClauseLibrary, clause_library_listener, invalid_regexes
+from app.services.ingest import IngestPipeline
+from app.services.scanner import scan_contract_text
+from app.storage_local import LocalFileStorage
+
+
+@pytest.fixture
+def session():
+    # one shared connection, usable from the threads some tests start
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[ClauseType.__table__, ClausePattern.__table__])
+    with Session(engine) as s:
+        yield s
+
+
+def _add(session, name: str, *patterns: tuple[str, bool]) -> ClauseType:
+    ct = ClauseType(name=name, patterns=[ClausePattern(pattern=p, is_regex=r) for p, r in patterns])
+    session.add(ct)
+    session.commit()
+    return ct
+
+
+def test_library_compiles_once_and_scans_like_the_orm_rows(session):
+    termination = _add(session, "Termination", ("terminate this agreement", False))
+    law = _add(session, "Governing Law", (r"governed\s+by", True))
+    library = ClauseLibrary()
+
+    compiled = library.clause_types(session)
+    assert [ct.id for ct in compiled] == [termination.id, law.id]
+    assert library.clause_types(session) is compiled  # cached snapshot
+
+    text = "We may terminate this agreement. Governed by Swiss law."
+    assert scan_contract_text(text, compiled) == scan_contract_text(text, [termination, law])
+
+
+def test_invalidation_reloads_only_touched_clause_types(session):
+    termination = _add(session, "Termination", ("terminate", False), (r"notice\s+period", True))
+    law = _add(session, "Governing Law", (r"governed\s+by", True))
+    library = ClauseLibrary()
+    before = {ct.id: ct for ct in library.clause_types(session)}
+
+    session.add(ClausePattern(clause_type_id=termination.id, pattern="cancel", is_regex=False))
+    session.commit()
+    library.invalidate([termination.id])
+    after = {ct.id: ct for ct in library.clause_types(session)}
+
+    assert after[law.id] is before[law.id]
+    assert len(after[termination.id].keywords) == 2
+    assert after[termination.id].regexes[0] is before[termination.id].regexes[0]  # not recompiled
+    assert after[termination.id].digest != before[termination.id].digest
+
+    session.delete(law)
+    session.commit()
+    library.invalidate([law.id])
+    assert [ct.id for ct in library.clause_types(session)] == [termination.id]
+
+
+class _EditAfterRead:
+    """Session proxy: runs `edit` once the library's pattern query has been read."""
+
+    def __init__(self, session, edit):
+        self._session = session
+        self._edit = edit
+        self._calls = 0
+
+    def execute(self, stmt):
+        self._calls += 1
+        result = self._session.execute(stmt)
+        if self._calls != 2:
+            return result
+        rows = list(result)
+        self._edit()
+        return rows
+
+
+def test_slow_full_reload_does_not_undo_a_newer_edit(session):
+    ct = _add(session, "Termination", ("terminate", False), ("cancel", False))
+    library = ClauseLibrary()
+    library.clause_types(session)
+    library.invalidate()  # e.g. the LISTEN connection reconnected
+
+    def edit():
+        # committed and reloaded while the full reload still holds the old rows
+        session.delete(ct.patterns[1])
+        session.commit()
+        library.invalidate([ct.id])
+        assert len(library.clause_types(session)[0].keywords) == 1
+
+    (compiled,) = library.clause_types(_EditAfterRead(session, edit))
+    assert len(compiled.keywords) == 1
+    (compiled,) = library.clause_types(session)
+    assert len(compiled.keywords) == 1
+
+
+class _SlowRead:
+    """Session proxy: blocks the library's first query until `release` is set."""
+
+    def __init__(self, session):
+        self._session = session
+        self.reading = threading.Event()
+        self.release = threading.Event()
+
+    def execute(self, stmt):
+        self.reading.set()
+        assert self.release.wait(5)
+        return self._session.execute(stmt)
+
+
+def test_readers_wait_for_the_first_load_instead_of_an_empty_library(session):
+    ct = _add(session, "Termination", ("terminate", False))
+    library = ClauseLibrary()
+    slow = _SlowRead(session)
+    loader = threading.Thread(target=library.clause_types, args=(slow,))
+    loader.start()
+    assert slow.reading.wait(5)
+
+    seen = []
+    reader = threading.Thread(target=lambda: seen.append(library.clause_types(session)))
+    reader.start()
+    reader.join(0.2)
+    assert reader.is_alive()  # not served the empty initial snapshot
+
+    slow.release.set()
+    loader.join(5)
+    reader.join(5)
+    assert [[c.id for c in snapshot] for snapshot in seen] == [[ct.id]]
+
+
+def test_listener_invalidates_library_and_drops_index_columns(session):
+    ct = _add(session, "Termination", ("terminate", False))
+    library = ClauseLibrary()
+    library.clause_types(session)
+    index = ClauseBitsetIndex()
+    index.add_contract(1)
+    index.set_cell(1, ct.id, detected=True, confirmed=None)
+
+    session.delete(ct)
+    session.commit()
+    clause_library_listener(library, index)({"changed": [], "deleted": [ct.id]})
+
+    assert library.clause_types(session) == ()
+    assert index.counts([ct.id])[ct.id]["detected"] == 0
+
+
+def test_stored_broken_regex_fails_the_scan_not_the_library(session, tmp_path):
+    # saved before regexes were validated on write
+    broken = _add(session, "Broken", ("(unclosed", True), ("terminate", False))
+    law = _add(session, "Governing Law", (r"governed\s+by", True))
+    library = ClauseLibrary()
+
+    compiled = library.clause_types(session)
+    assert [ct.id for ct in compiled] == [broken.id, law.id]
+    assert len(compiled[0].invalid) == 1
+    assert library.clause_types(session) is compiled  # loaded, not retried on every call
+
+    pipeline = IngestPipeline(compiled)
+    stored = LocalFileStorage(str(tmp_path)).save(
+        pipeline.wrap(io.BytesIO(b"Governed by Swiss law.")), original_filename="a.md"
+    )
+    assert stored.size_bytes == 22  # the upload itself goes through
+    with pytest.raises(re.error, match=r"invalid regex '\(unclosed'"):
+        pipeline.finish()  # -> contract recorded as failed
+    assert scan_contract_text("Governed by Swiss law.", compiled[1:])[0].detected is True
+
+
+def test_invalid_regexes_are_reported():
+    patterns = [ClausePattern(pattern="(unclosed", is_regex=True), ClausePattern(pattern="(fine)", is_regex=False)]
+    assert [b["pattern"] for b in invalid_regexes(patterns)] == ["(unclosed"]
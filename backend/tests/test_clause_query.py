@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.model import Contract
+from app.services.clause_query import (
+    AndExpr,
+    ClauseLeaf,
+    ContractQueryIn,
+    NotExpr,
+    compile_where,
+    count_nodes,
+    iter_leaves,
+)
+
+
+def _sql(where) -> str:
+    stmt = select(Contract.id).where(where)
+    return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_parses_nested_expression_with_ids_and_names():
+    q = ContractQueryIn.model_validate(
+        {
+            "where": {
+                "and": [
+                    {"clause_type": "Termination", "effective": True},
+                    {"not": {"clause_type": 7}},
+                ]
+            }
+        }
+    )
+    assert isinstance(q.where, AndExpr)
+    assert isinstance(q.where.and_[1], NotExpr)
+    assert {leaf.clause_type for leaf in iter_leaves(q.where)} == {"Termination", 7}
+    assert count_nodes(q.where) == 4
+
+
+def test_rejects_unknown_operators():
+    with pytest.raises(ValidationError):
+        ContractQueryIn.model_validate({"where": {"xor": [{"clause_type": 1}]}})
+
+
+def test_false_leaf_compiles_to_not_exists():
+    sql = _sql(compile_where(ClauseLeaf(clause_type="Liability Cap", effective=False), {"Liability Cap": 3}))
+    assert "NOT (EXISTS" in sql
+    assert "contract_clauses.clause_type_id = 3" in sql
+
+
+def test_and_of_leaves_is_a_single_query():
+    expr = AndExpr.model_validate(
+        {"and": [{"clause_type": 1, "effective": True}, {"clause_type": 2, "effective": False}]}
+    )
+    sql = _sql(compile_where(expr, {1: 1, 2: 2}))
+    assert sql.count("EXISTS") == 2
+    assert " AND " in sql
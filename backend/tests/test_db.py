@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from sqlalchemy.pool import NullPool
+
+from app.db import engine_options_from_env
+
+
+def test_pool_options_come_from_env(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "12")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "3")
+    monkeypatch.setenv("DB_POOL_RECYCLE", "600")
+    monkeypatch.delenv("DB_PGBOUNCER", raising=False)
+    monkeypatch.delenv("DB_POOL_PRE_PING", raising=False)
+
+    opts = engine_options_from_env()
+
+    assert opts["pool_size"] == 12
+    assert opts["max_overflow"] == 3
+    assert opts["pool_recycle"] == 600
+    assert opts["pool_pre_ping"] is False
+
+
+def test_pgbouncer_mode_disables_local_pooling_and_prepares(monkeypatch):
+    monkeypatch.setenv("DB_PGBOUNCER", "true")
+
+    opts = engine_options_from_env()
+
+    assert opts["poolclass"] is NullPool
+    assert opts["connect_args"] == {"prepare_threshold": None}
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from app.services.events import ContractEventHub, contract_status_event
+
+
+def test_status_event_is_small_and_json_safe():
+    contract = SimpleNamespace(
+        id=7,
+        original_filename="x" * 255,
+        created_at=datetime(2026, 2, 4, tzinfo=timezone.utc),
+        processing_status="failed",
+        processed_at=datetime(2026, 2, 5, tzinfo=timezone.utc),
+        error_message="x" * 5000,
+    )
+    event = contract_status_event(contract)
+    assert event["type"] == "status"
+    assert event["processed_at"] == "2026-02-05T00:00:00+00:00"
+    assert len(json.dumps(event)) < 8000  # NOTIFY payload limit
+
+
+def test_hub_fans_out_to_every_subscriber():
+    hub = ContractEventHub("postgresql+psycopg://u:p@localhost/db")
+    hub._thread = SimpleNamespace(is_alive=lambda: True)  # no listener thread in unit tests
+    a, b = hub.subscribe(), hub.subscribe()
+    hub.unsubscribe(b)
+
+    hub._dispatch(json.dumps({"type": "status", "contract_id": 1}))
+
+    assert a.get_nowait()["contract_id"] == 1
+    assert b.empty()
+
+
+def test_hub_uses_plain_libpq_url():
+    hub = ContractEventHub("postgresql+psycopg://u:p@localhost:5432/db")
+    assert hub._dsn == "postgresql://u:p@localhost:5432/db"
+
+
+def test_hub_routes_other_channels_to_listeners():
+    hub = ContractEventHub("postgresql+psycopg://u:p@localhost/db")
+    hub._thread = SimpleNamespace(is_alive=lambda: True)
+    q = hub.subscribe()
+    seen = []
+    hub.add_listener("clause_library", seen.append)
+
+    hub._call_listeners("clause_library", json.dumps({"changed": [3], "deleted": []}))
+    hub._call_listeners("clause_library", None)  # reconnect: state unknown
+
+    assert seen == [{"changed": [3], "deleted": []}, None]
+    assert q.empty()  # not an SSE event
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services.export import CsvExportWriter, NdjsonExportWriter, ParquetExportWriter
+
+CREATED = datetime(2026, 2, 5, 12, 0, tzinfo=timezone.utc)
+ROWS = [
+    (1, "a.md", CREATED, 10, "Termination", True, None, True),
+    (1, "a.md", CREATED, 11, "Liability Cap", False, True, True),
+]
+
+
+def _stream(writer, batches) -> bytes:
+    out = writer.header()
+    for batch in batches:
+        out += writer.write_batch(batch)
+    return out + writer.finish()
+
+
+def test_csv_export_streams_header_then_rows():
+    data = _stream(CsvExportWriter(), [ROWS[:1], ROWS[1:]]).decode("utf-8").splitlines()
+    assert data[0].startswith("contract_id,original_filename")
+    assert data[1] == "1,a.md,2026-02-05T12:00:00+00:00,10,Termination,True,,True"
+    assert len(data) == 3
+
+
+def test_ndjson_export_one_object_per_cell():
+    lines = _stream(NdjsonExportWriter(), [ROWS]).decode("utf-8").splitlines()
+    assert [json.loads(line)["clause_type_name"] for line in lines] == ["Termination", "Liability Cap"]
+    assert json.loads(lines[0])["confirmed"] is None
+
+
+def test_parquet_export_is_readable_from_streamed_chunks():
+    pq = pytest.importorskip("pyarrow.parquet")
+    data = _stream(ParquetExportWriter(), [ROWS[:1], ROWS[1:]])
+    table = pq.read_table(io.BytesIO(data))
+    assert table.num_rows == 2
+    assert table.column("confirmed").to_pylist() == [None, True]
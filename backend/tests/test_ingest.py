@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from app.services.ingest import IngestPipeline, IngestRejected
+from app.services.scanner import StreamingScanner
+from app.storage_local import LocalFileStorage
+
+
+class ChunkedStream(io.BytesIO):
+    """Returns at most `step` bytes per read, like a slow network upload."""
+
+    def __init__(self, data: bytes, step: int):
+        super().__init__(data)
+        self.step = step
+
+    def read(self, size=-1):
+        return super().read(self.step)
+
+
+def test_match_across_chunk_boundary_is_found(make_clause_type):
+    scanner = StreamingScanner([make_clause_type(1, ("terminate this agreement", False))])
+    scanner.feed("we may termin")
+    scanner.feed("ate this AGREEMENT now")
+    assert scanner.results()[0].detected is True
+
+
+def test_store_and_scan_in_one_pass(tmp_path, make_clause_type):
+    storage = LocalFileStorage(str(tmp_path))
+    pipeline = IngestPipeline([make_clause_type(1, (r"liability\s+cap", True))])
+    body = ("x" * 100 + " Liability  cap ü ").encode("utf-8") * 3
+
+    stored = storage.save(pipeline.wrap(ChunkedStream(body, 7)), original_filename="a.md")
+
+    assert stored.size_bytes == len(body)
+    assert pipeline.finish()[0].detected is True
+
+
+def test_invalid_utf8_after_the_head_is_rejected_and_not_stored(tmp_path):
+    storage = LocalFileStorage(str(tmp_path))
+    pipeline = IngestPipeline([])
+    body = b"a" * (128 * 1024) + b"\xff\xfe"
+
+    with pytest.raises(IngestRejected) as exc:
+        storage.save(pipeline.wrap(io.BytesIO(body)), original_filename="a.md")
+    assert exc.value.code == "invalid_encoding"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_truncated_utf8_sequence_is_rejected_on_finish():
+    pipeline = IngestPipeline([])
+    pipeline.feed("ü".encode("utf-8")[:1])
+    with pytest.raises(IngestRejected):
+        pipeline.finish()
+
+
+def test_nul_byte_is_rejected():
+    with pytest.raises(IngestRejected) as exc:
+        IngestPipeline([]).feed(b"abc\x00def")
+    assert exc.value.code == "binary_file_rejected"
+
+
+def test_keyword_cut_at_chunk_end_is_not_a_false_match(make_clause_type):
+    scanner = StreamingScanner([make_clause_type(1, ("term", False))])
+    scanner.feed("the term")
+    scanner.feed("inal date")
+    assert scanner.results()[0].detected is False
+
+
+def test_keyword_evidence_points_into_the_stored_original(tmp_path, make_clause_type):
+    data = b"Intro.\nWe may **Terminate**\nthis agreement."
+    pipeline = IngestPipeline([make_clause_type(1, ("terminate this agreement", False))])
+    LocalFileStorage(str(tmp_path)).save(pipeline.wrap(ChunkedStream(data, 5)), original_filename="a.md")
+
+    (result,) = pipeline.finish()
+    start, end = result.evidence
+    assert data.decode()[start:end] == "Terminate**\nthis agreement"
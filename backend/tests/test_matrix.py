@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import itertools
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.model import ClauseType, Contract, ContractClause
+from app.services.matrix import clause_counts_select, effective_is, matrix_json_select
+
+# every (confirmed, detected) combination a matrix cell can hold
+CELLS = list(itertools.product([True, False, None], [True, False]))
+
+
+def _contract(session, n: int) -> Contract:
+    contract = Contract(
+        original_filename=f"c{n}.txt",
+        storage_backend="local",
+        storage_key=f"k{n}",
+        size_bytes=1,
+        sha256_hex="0" * 64,
+    )
+    session.add(contract)
+    return contract
+
+
+@pytest.fixture
+def matrix(matrix_session):
+    """One clause type, one contract per (confirmed, detected) cell, plus one without a row."""
+    ct = ClauseType(name="Termination")
+    matrix_session.add(ct)
+    contracts = {cell: _contract(matrix_session, i) for i, cell in enumerate(CELLS)}
+    missing = _contract(matrix_session, len(CELLS))
+    matrix_session.flush()
+    for (confirmed, detected), contract in contracts.items():
+        matrix_session.add(
+            ContractClause(
+                contract_id=contract.id, clause_type_id=ct.id, detected=detected, confirmed=confirmed
+            )
+        )
+    matrix_session.commit()
+    return ct, contracts, missing
+
+
+def _expected_effective(confirmed: bool | None, detected: bool) -> bool:
+    return detected if confirmed is None else confirmed
+
+
+def test_effective_is_confirmed_overriding_detected(matrix_session, matrix):
+    ct, contracts, _ = matrix
+    rows = matrix_session.execute(
+        select(ContractClause.contract_id, ContractClause.effective).where(
+            ContractClause.clause_type_id == ct.id
+        )
+    ).all()
+    by_contract = dict(rows)
+
+    for (confirmed, detected), contract in contracts.items():
+        assert by_contract[contract.id] is _expected_effective(confirmed, detected), (confirmed, detected)
+
+
+@pytest.mark.parametrize("value", [True, False])
+def test_effective_filter_follows_confirmed_then_detected(matrix_session, matrix, value):
+    ct, contracts, missing = matrix
+    ids = set(matrix_session.scalars(select(Contract.id).where(effective_is(ct.id, value))))
+
+    expected = {c.id for cell, c in contracts.items() if _expected_effective(*cell) is value}
+    if not value:
+        expected.add(missing.id)  # no row reads as not present
+    assert ids == expected
+
+
+def test_clause_counts_split_detected_confirmed_and_effective(matrix_session, matrix):
+    ct, _, _ = matrix
+    (row,) = matrix_session.execute(clause_counts_select()).all()
+
+    assert row.clause_type_id == ct.id
+    assert row.detected == sum(detected for _, detected in CELLS)
+    assert row.confirmed_present == sum(confirmed is True for confirmed, _ in CELLS)
+    assert row.confirmed_missing == sum(confirmed is False for confirmed, _ in CELLS)
+    # confirmed true (2) + unconfirmed and detected (1)
+    assert row.effective == sum(_expected_effective(*cell) for cell in CELLS) == 3
+
+
+def test_matrix_json_select_is_one_ordered_aggregate_over_all_clause_types():
+    sql = str(
+        matrix_json_select(42).compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+    assert sql.count("SELECT") == 1
+    assert "json_agg(json_build_object(" in sql
+    assert "ORDER BY clause_types.name" in sql
+    assert "FROM clause_types LEFT OUTER JOIN contract_clauses" in sql
+    assert "contract_clauses.contract_id = 42" in sql
+    # missing rows report false; confirmed stays null so the UI can tell "not reviewed"
+    assert "coalesce(contract_clauses.effective, false)" in sql
+    assert "coalesce(contract_clauses.detected, false)" in sql
+    assert "'confirmed', contract_clauses.confirmed" in sql
+    assert "'[]'::json" in sql
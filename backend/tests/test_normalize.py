@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from app.services.normalize import TextNormalizer, normalize_text
+
+
+def test_casefold_whitespace_and_markdown():
+    assert normalize_text("## **Termination**\n\n  of   THIS _Agreement_") == "termination of this agreement"
+    assert normalize_text("Straße") == "strasse"
+
+
+def test_streaming_matches_one_shot():
+    text = "We may **terminate**\nthis   agreement.\n"
+    n = TextNormalizer()
+    streamed = "".join(n.feed(text[i : i + 3]) for i in range(0, len(text), 3))
+    assert streamed == normalize_text(text)
+
+
+def test_offsets_map_back_to_original():
+    text = "Intro.\n\n**Terminate**  this"
+    n = TextNormalizer()
+    norm = n.feed(text)
+    start = norm.index("terminate")
+    assert text[n.offsets.to_original(start) :].startswith("Terminate")
+    assert text[n.offsets.to_original(norm.index("this")) :] == "this"
+
+
+def test_offsets_survive_length_changing_casefold():
+    text = "Maß und Ziel"
+    n = TextNormalizer()
+    norm = n.feed(text)
+    assert norm == "mass und ziel"
+    assert text[n.offsets.to_original(norm.index("und")) :].startswith("und")
+
+
+def test_offsets_only_break_where_the_shift_changes():
+    text = "plain prose with single spaces only. " * 1000
+    n = TextNormalizer()
+    norm = n.feed(text)
+    assert len(n.offsets.norm) == 1
+    assert n.offsets.to_original(norm.rindex("spaces")) == text.rindex("spaces")
+
+    text = "a  b\n\n**c** d"
+    n = TextNormalizer()
+    norm = n.feed(text)
+    assert [text[n.offsets.to_original(i)] for i in range(len(norm)) if norm[i] != " "] == ["a", "b", "c", "d"]
+    assert len(n.offsets.norm) == 4  # start, then after each collapsed run: "  ", "\n\n**", "** "
+
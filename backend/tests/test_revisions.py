@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import hashlib
+import io
+from types import SimpleNamespace
+
+from app.services.revisions import (
+    apply_delta,
+    diff_texts,
+    encode_delta,
+    load_revision_text,
+    rebuild_revision_text,
+    rescan_revision,
+    revision_chain,
+    store_as_delta,
+)
+from app.services.scanner import scan_contract_text
+from app.storage import StorageRegistry
+from app.storage_local import LocalFileStorage
+
+
+def _paragraphs(n: int) -> list[str]:
+    return [f"Section {i}. The parties agree to clause number {i}.\n" for i in range(n)]
+
+
+def _cells(text: str, clause_types) -> dict:
+    return {
+        r.clause_type_id: SimpleNamespace(
+            detected=r.detected,
+            confirmed=None,
+            evidence_start=r.evidence[0] if r.evidence else None,
+            evidence_end=r.evidence[1] if r.evidence else None,
+            patterns_digest=r.patterns_digest,
+        )
+        for r in scan_contract_text(text, clause_types)
+    }
+
+
+def test_delta_round_trip_and_changed_ranges():
+    lines = _paragraphs(50)
+    old = "".join(lines)
+    lines[10] = "Section 10. Either party may terminate this agreement.\n"
+    del lines[30]
+    new = "".join(lines)
+
+    diff = diff_texts(old, new)
+    assert apply_delta(old, encode_delta(diff, "sha")) == new
+    assert [new[s:e] for s, e in diff.changed] == [lines[10], ""]
+    assert len(encode_delta(diff, "sha")) * 2 < len(new.encode())
+
+
+def test_map_span_only_maps_unchanged_text():
+    old = "aaa\nbbb\nccc\n"
+    new = "zzz\naaa\nbbX\nccc\n"
+    diff = diff_texts(old, new)
+    assert diff.map_span(0, 3) == (4, 7)  # "aaa" moved down one line
+    assert diff.map_span(4, 7) is None  # "bbb" was edited
+    assert diff.map_span(8, 11) == (12, 15)
+
+
+def test_store_as_delta_takes_periodic_snapshots():
+    assert store_as_delta(100, 10_000, depth=0, snapshot_every=10)
+    assert not store_as_delta(100, 10_000, depth=9, snapshot_every=10)
+    assert not store_as_delta(6_000, 10_000, depth=0, snapshot_every=10)
+
+
+def test_rescan_revision_matches_full_scan_while_scanning_less(make_clause_type):
+    clause_types = [
+        make_clause_type(1, ("clause number 5", False)),  # unchanged, carried
+        make_clause_type(2, ("terminate this agreement", False)),  # new in the edit
+        make_clause_type(3, (r"number\s+20\.", True)),  # removed by the edit
+        make_clause_type(4, ("force majeure", False)),  # absent before and after
+    ]
+    lines = _paragraphs(2000)
+    old = "".join(lines)
+    lines[20] = "Section 20. Either party may terminate this agreement.\n"
+    new = "".join(lines)
+
+    diff = diff_texts(old, new)
+    scan = rescan_revision(new, diff, clause_types, _cells(old, clause_types), margin=200)
+
+    assert scan.results == scan_contract_text(new, clause_types)
+    assert scan.carried == 1
+    assert scan.full_scans == 1  # type 3: its evidence was inside the edit
+    assert scan.scanned_chars < 2 * len(new)
+
+
+def test_rescan_revision_ignores_matches_away_from_edits(make_clause_type):
+    # the parent's result is trusted for unchanged text: with the same patterns
+    # digest, only matches touching an edit are looked for
+    clause_types = [make_clause_type(1, ("clause number 3", False))]
+    old = "".join(_paragraphs(10))
+    new = old + "Appendix.\n"
+    cells = _cells(old, clause_types)
+    cells[1].detected, cells[1].evidence_start, cells[1].evidence_end = False, None, None
+
+    scan = rescan_revision(new, diff_texts(old, new), clause_types, cells, margin=500)
+    assert scan.results[0].detected is False
+
+
+def test_rescan_revision_rescans_fully_when_patterns_changed(make_clause_type):
+    old = "".join(_paragraphs(10))
+    new = old + "Appendix.\n"
+    cells = _cells(old, [make_clause_type(1, ("appendix", False))])
+    clause_types = [make_clause_type(1, ("clause number 3", False))]
+
+    scan = rescan_revision(new, diff_texts(old, new), clause_types, cells)
+    assert scan.results[0].detected is True
+    assert scan.full_scans == 1
+
+
+def test_load_revision_text_follows_the_delta_chain(tmp_path):
+    storage = LocalFileStorage(str(tmp_path))
+    registry = StorageRegistry(storage)
+    texts = ["".join(_paragraphs(20))]
+    texts.append(texts[0].replace("clause number 4.", "clause number four."))
+    texts.append(texts[1] + "Signed.\n")
+
+    contracts = {}
+    for i, text in enumerate(texts, start=1):
+        if i == 1:
+            data, kind = text.encode(), "full"
+        else:
+            data, kind = encode_delta(diff_texts(texts[i - 2], text), "sha"), "delta"
+        stored = storage.save(io.BytesIO(data), original_filename="c.md")
+        contracts[i] = SimpleNamespace(
+            id=i,
+            parent_id=i - 1 or None,
+            storage_backend=stored.backend,
+            storage_key=stored.key,
+            storage_kind=kind,
+            sha256_hex=hashlib.sha256(text.encode()).hexdigest(),
+        )
+
+    session = SimpleNamespace(get=lambda _model, contract_id: contracts[contract_id])
+    assert load_revision_text(session, contracts[3], registry) == (texts[2], 2)
+
+    chain = revision_chain(session, contracts[3])
+    assert [obj.contract_id for obj in chain] == [1, 2, 3]
+    contracts.clear()  # rebuilding only reads storage, after the transaction is over
+    assert rebuild_revision_text(chain, registry) == (texts[2], 2)
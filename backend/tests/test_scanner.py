@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import random
+import re
 from dataclasses import dataclass
 
-from app.services.scanner import scan_contract_text
+import pytest
+
+from app.services.scanner import StreamingScanner, compile_keyword, keyword_matches, scan_contract_text
 
 
 @dataclass
@@ -60,3 +64,97 @@ def test_empty_patterns_is_false():
     text = "anything at all"
     results = scan_contract_text(text, clause_types)
     assert results[0].detected is False
+
+
+def test_keyword_matches_across_line_breaks_and_markdown(make_clause_type):
+    clause_types = [make_clause_type(1, ("limitation of liability", False))]
+    text = "## **Limitation  of**\nLiability\n\nThe parties agree..."
+    results = scan_contract_text(text, clause_types)
+    assert results[0].detected is True
+
+
+def test_keyword_does_not_match_inside_words(make_clause_type):
+    clause_types = [make_clause_type(1, ("term", False))]
+    text = "The parties determine the terminology."
+    results = scan_contract_text(text, clause_types)
+    assert results[0].detected is False
+
+
+def test_keyword_at_end_of_text_is_found(make_clause_type):
+    clause_types = [make_clause_type(1, ("indemnity", False))]
+    results = scan_contract_text("Section 9: Indemnity", clause_types)
+    assert results[0].detected is True
+
+
+def test_evidence_points_into_the_original_text(make_clause_type):
+    clause_types = [
+        make_clause_type(1, ("limitation of liability", False)),
+        make_clause_type(2, (r"governed\s+by", True)),
+    ]
+    text = "Intro.\n## **Limitation  of**\nLiability applies. This is GOVERNED by law."
+    kw, rx = scan_contract_text(text, clause_types)
+    assert text[kw.evidence[0] : kw.evidence[1]] == "Limitation  of**\nLiability"
+    assert text[rx.evidence[0] : rx.evidence[1]] == "GOVERNED by"
+    assert kw.patterns_digest != rx.patterns_digest
+
+
+@pytest.fixture
+def chunking_clause_types(make_clause_type):
+    return [
+        make_clause_type(1, ("indemnity", False)),
+        make_clause_type(2, ("term", False)),
+        make_clause_type(3, ("limitation of liability", False)),
+        make_clause_type(4, (r"terminate\s+this", True)),
+        make_clause_type(5, (r"\bgoverned by\b", True)),
+    ]
+
+
+CHUNKING_TEXTS = [
+    "Indemnity",
+    "Terminate this",
+    "term y",
+    "determine the term",
+    "We TERMINATE  this; ## **Limitation of**\nliability, governed by law.",
+    "terminated thisness; the determined terms are governed byway of Indemnity",
+]
+
+
+def _scan_chunked(clause_types, chunks: list[str]):
+    scanner = StreamingScanner(clause_types)
+    for chunk in chunks:
+        scanner.feed(chunk)
+    return scanner.results()
+
+
+def test_chunked_scan_matches_one_shot_at_every_split_point(chunking_clause_types):
+    for text in CHUNKING_TEXTS:
+        expected = scan_contract_text(text, chunking_clause_types)
+        for i in range(len(text) + 1):
+            assert _scan_chunked(chunking_clause_types, [text[:i], text[i:]]) == expected, (text, i)
+
+
+def test_chunked_scan_matches_one_shot_for_random_chunkings(chunking_clause_types):
+    rng = random.Random(1234)
+    words = ["term", "terms", "indemnity", "terminate", "this", "thisness", "limitation", "of",
+             "liability", "governed", "by", "**", "##", "determine", "\n", " ", "  ", "."]
+    for _ in range(300):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 12)))
+        expected = scan_contract_text(text, chunking_clause_types)
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(1, 6))))
+        chunks = [text[a:b] for a, b in zip([0, *cuts], [*cuts, len(text)])]
+        assert _scan_chunked(chunking_clause_types, chunks) == expected, (text, chunks)
+
+
+def test_keyword_matches_agree_with_a_lookbehind_boundary():
+    rng = random.Random(99)
+    for keyword in ["a a", "ab", "a", "ab ab", "-x", "x-"]:
+        pattern = compile_keyword(keyword)
+        lookbehind = re.compile(r"(?<!\w)" + pattern.pattern) if keyword[0].isalnum() else pattern
+        for _ in range(200):
+            text = "".join(rng.choice("ab x-") for _ in range(rng.randint(0, 20)))
+            got = [m.span() for m in keyword_matches(pattern, text)]
+            assert got == [m.span() for m in lookbehind.finditer(text)], (keyword, text)
+
+
+def test_keyword_after_a_rejected_overlapping_candidate_is_found(make_clause_type):
+    assert scan_contract_text("xa a a", [make_clause_type(1, ("a a", False))])[0].evidence == (3, 6)
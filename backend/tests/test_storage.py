@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import hashlib
+import io
+
+import pytest
+
+from app.storage_cache import CachedStorage
+from app.storage_compression import CompressedStorage
+from app.storage_local import LocalFileStorage
+from app.storage_s3 import MIN_PART_SIZE, S3Storage
+
+
+class FakeS3Client:
+    """In-memory stand-in for the subset of the S3 API the backend uses."""
+
+    def __init__(self):
+        self.objects: dict[str, bytes] = {}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+        self.get_calls = 0
+
+    def put_object(self, *, Bucket, Key, Body):
+        self.objects[Key] = Body
+
+    def create_multipart_upload(self, *, Bucket, Key):
+        upload_id = f"u{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, *, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = Body
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, *, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.objects[Key] = b"".join(parts[p["PartNumber"]] for p in MultipartUpload["Parts"])
+
+    def abort_multipart_upload(self, *, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+
+    def get_object(self, *, Bucket, Key):
+        self.get_calls += 1
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+    def delete_object(self, *, Bucket, Key):
+        self.objects.pop(Key, None)
+
+
+def test_local_save_and_open(tmp_path):
+    storage = LocalFileStorage(str(tmp_path))
+    stored = storage.save(io.BytesIO(b"world"), original_filename="a.md", first_chunk=b"hello ")
+
+    assert stored.key.endswith(".md")
+    assert stored.size_bytes == 11
+    assert stored.sha256_hex == hashlib.sha256(b"hello world").hexdigest()
+    with storage.open(stored.key) as fh:
+        assert fh.read() == b"hello world"
+
+
+def test_local_save_removes_partial_file_on_error(tmp_path):
+    class Exploding(io.BytesIO):
+        def read(self, size=-1):
+            raise ValueError("boom")
+
+    storage = LocalFileStorage(str(tmp_path))
+    with pytest.raises(ValueError):
+        storage.save(Exploding(), original_filename="a.md", first_chunk=b"x")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_s3_small_object_uses_single_put():
+    client = FakeS3Client()
+    storage = S3Storage("bucket", client=client)
+    stored = storage.save(io.BytesIO(b"small"), original_filename="a.txt")
+
+    assert client.objects[f"contracts/{stored.key}"] == b"small"
+    with storage.open(stored.key) as fh:
+        assert fh.read() == b"small"
+
+
+def test_s3_large_object_is_uploaded_in_parts():
+    client = FakeS3Client()
+    storage = S3Storage("bucket", client=client, part_size=MIN_PART_SIZE)
+    body = bytes(range(256)) * (MIN_PART_SIZE * 2 // 256 + 7)
+
+    stored = storage.save(io.BytesIO(body), original_filename="a.txt")
+
+    assert client.objects[f"contracts/{stored.key}"] == body
+    assert stored.size_bytes == len(body)
+    assert stored.sha256_hex == hashlib.sha256(body).hexdigest()
+    assert client.uploads == {}
+
+
+def test_cache_serves_repeat_reads_locally_and_evicts_lru(tmp_path):
+    client = FakeS3Client()
+    remote = S3Storage("bucket", client=client)
+    keys = [remote.save(io.BytesIO(b"x" * 10), original_filename="a.txt").key for _ in range(3)]
+
+    cache = CachedStorage(remote, str(tmp_path / "cache"), max_bytes=20)
+    for key in keys[:2]:
+        with cache.open(key) as fh:
+            assert fh.read() == b"x" * 10
+    assert client.get_calls == 2
+
+    with cache.open(keys[0]) as fh:  # hit: no remote GET, becomes most recent
+        fh.read()
+    assert client.get_calls == 2
+
+    with cache.open(keys[2]) as fh:  # evicts keys[1], the least recently used
+        fh.read()
+    assert sorted(p.name for p in (tmp_path / "cache").iterdir()) == sorted([keys[0], keys[2]])
+
+
+def test_cache_writes_uploads_through(tmp_path):
+    client = FakeS3Client()
+    cache = CachedStorage(S3Storage("bucket", client=client), str(tmp_path), max_bytes=1024)
+
+    stored = cache.save(io.BytesIO(b"body"), original_filename="a.md", first_chunk=b"head ")
+    with cache.open(stored.key) as fh:
+        assert fh.read() == b"head body"
+    assert client.get_calls == 0
+
+
+LEGAL_TEXT = b"".join(
+    b"%d. The Supplier shall indemnify the Customer against all claims arising hereunder.\n" % i
+    for i in range(50_000)
+)
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd"])
+def test_compressed_storage_round_trip(tmp_path, codec):
+    if codec == "zstd":
+        pytest.importorskip("compression.zstd")
+    inner = LocalFileStorage(str(tmp_path))
+    storage = CompressedStorage(inner, codec)
+
+    stored = storage.save(io.BytesIO(LEGAL_TEXT[100:]), original_filename="a.md", first_chunk=LEGAL_TEXT[:100])
+
+    # size and hash describe the original bytes, not what is on disk
+    assert stored.size_bytes == len(LEGAL_TEXT)
+    assert stored.sha256_hex == hashlib.sha256(LEGAL_TEXT).hexdigest()
+    assert (tmp_path / stored.key).stat().st_size * 4 < len(LEGAL_TEXT)
+
+    chunks = []
+    with storage.open(stored.key) as fh:
+        while chunk := fh.read(1024 * 1024):
+            assert len(chunk) <= 1024 * 1024  # streamed, not materialized
+            chunks.append(chunk)
+    assert b"".join(chunks) == LEGAL_TEXT
+
+
+def test_compressed_storage_rejects_unavailable_zstd_up_front(tmp_path):
+    try:
+        from compression import zstd  # noqa: F401
+    except ImportError:
+        with pytest.raises(RuntimeError, match="zstd"):
+            CompressedStorage(LocalFileStorage(str(tmp_path)), "zstd")
+    else:
+        pytest.skip("compression.zstd is available")
+
+
+def test_compressed_storage_reads_objects_by_key_suffix(tmp_path):
+    inner = LocalFileStorage(str(tmp_path))
+    plain = inner.save(io.BytesIO(b"stored before compression"), original_filename="a.md")
+    gzipped = CompressedStorage(inner, "gzip").save(io.BytesIO(b"stored as gzip"), original_filename="b.md")
+
+    storage = CompressedStorage(inner, None)  # compression switched off again
+    with storage.open(plain.key) as fh:
+        assert fh.read() == b"stored before compression"
+    with storage.open(gzipped.key) as fh:
+        assert fh.read() == b"stored as gzip"
+
+
+def test_compressed_storage_over_s3():
+    client = FakeS3Client()
+    storage = CompressedStorage(S3Storage("bucket", client=client, part_size=MIN_PART_SIZE), "gzip")
+    body = LEGAL_TEXT * 3
+
+    stored = storage.save(io.BytesIO(body), original_filename="a.txt")
+
+    assert stored.key.endswith(".gz")
+    assert stored.sha256_hex == hashlib.sha256(body).hexdigest()
+    assert len(client.objects[f"contracts/{stored.key}"]) < len(body) // 4
+    with storage.open(stored.key) as fh:
+        assert fh.read() == body
@@ -14,6 +14,8 @@ export type ContractDetail = {
     created_at: string;
     processed_at: string | null;
     error_message: string | null;
+    parent_id: number | null;
+    revision: number;
   };
   matrix: Array<{
     clause_type: { id: number; name: string };
@@ -23,6 +25,16 @@ export type ContractDetail = {
   }>;
 };
 
+export type ContractEvent = {
+  type: "status";
+  contract_id: number;
+  original_filename?: string;
+  created_at?: string | null;
+  processing_status?: string;
+  processed_at?: string | null;
+  error_message?: string | null;
+};
+
 async function http<T>(path: string, init?: RequestInit): Promise<T> {
   const r = await fetch(path, init);
   if (!r.ok) {
@@ -46,6 +58,13 @@ export async function uploadContract(file: File) {
   return http("/api/contracts", { method: "POST", body: fd });
 }
 
+// New revision of a contract: stored as a delta, only the edited regions are rescanned.
+export async function uploadRevision(contractId: number, file: File): Promise<{ id: number; revision: number }> {
+  const fd = new FormData();
+  fd.append("file", file);
+  return http(`/api/contracts/${contractId}/revisions`, { method: "POST", body: fd });
+}
+
 export function setOverride(contractId: number, clauseTypeId: number, confirmed: boolean | null) {
   return http(`/api/contracts/${contractId}/clauses/${clauseTypeId}`, {
     method: "PATCH",
@@ -53,3 +72,16 @@ export function setOverride(contractId: number, clauseTypeId: number, confirmed:
     body: JSON.stringify({ confirmed }),
   });
 }
+
+// Server-sent events (backed by Postgres LISTEN/NOTIFY); returns an unsubscribe function.
+// Without a contract id, events for all contracts are streamed.
+export function subscribeContractEvents(
+  contractId: number | null,
+  onEvent: (e: ContractEvent) => void,
+): () => void {
+  const url = contractId === null ? "/api/contracts/events" : `/api/contracts/${contractId}/events`;
+  const source = new EventSource(url);
+  const handler = (m: MessageEvent) => onEvent(JSON.parse(m.data) as ContractEvent);
+  source.addEventListener("status", handler);
+  return () => source.close();
+}
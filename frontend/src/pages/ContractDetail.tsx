@@ -1,18 +1,27 @@
-import { useEffect, useState } from "react";
-import { Link, useParams } from "react-router-dom";
-import { getContract, setOverride, ContractDetail as Detail } from "../api";
+import { useEffect, useRef, useState } from "react";
+import { Link, useNavigate, useParams } from "react-router-dom";
+import {
+  getContract,
+  setOverride,
+  subscribeContractEvents,
+  uploadRevision,
+  ContractDetail as Detail,
+} from "../api";
 
 export default function ContractDetail() {
   const { id } = useParams();
   const contractId = Number(id);
+  const navigate = useNavigate();
 
   const [data, setData] = useState<Detail | null>(null);
   const [err, setErr] = useState<string | null>(null);
   const [busyKey, setBusyKey] = useState<string | null>(null);
+  const status = useRef<string | null>(null);
 
   async function refresh() {
     try {
       const d = await getContract(contractId);
+      status.current = d.contract.processing_status;
       setData(d);
     } catch (e: any) {
       setErr(e?.message ?? String(e));
@@ -24,6 +33,16 @@ export default function ContractDetail() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [contractId]);
 
+  // Status changes are pushed by the server; the matrix is only re-fetched on a transition.
+  useEffect(() => {
+    return subscribeContractEvents(contractId, (e) => {
+      if (e.type === "status" && e.processing_status !== status.current) {
+        refresh();
+      }
+    });
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [contractId]);
+
   async function applyOverride(clauseTypeId: number, confirmed: boolean | null) {
     const key = `${contractId}:${clauseTypeId}:${confirmed}`;
     setBusyKey(key);
@@ -38,6 +57,20 @@ export default function ContractDetail() {
     }
   }
 
+  async function onRevisionFile(file: File | undefined) {
+    if (!file) return;
+    setBusyKey("revision");
+    setErr(null);
+    try {
+      const r = await uploadRevision(contractId, file);
+      navigate(`/contracts/${r.id}`);
+    } catch (e: any) {
+      setErr(e?.message ?? String(e));
+    } finally {
+      setBusyKey(null);
+    }
+  }
+
   if (!data) {
     return (
       <div className="container">
@@ -62,10 +95,28 @@ export default function ContractDetail() {
           <div>
             <h2 style={{ margin: 0 }}>{c.original_filename}</h2>
             <div className="muted">
-              #{c.id} · {c.processing_status} · created {new Date(c.created_at).toLocaleString()}
+              #{c.id} · rev {c.revision}
+              {c.parent_id !== null && (
+                <>
+                  {" "}(of <Link to={`/contracts/${c.parent_id}`}>#{c.parent_id}</Link>)
+                </>
+              )}{" "}
+              · {c.processing_status} · created {new Date(c.created_at).toLocaleString()}
             </div>
           </div>
-          <Link className="btn" to="/contracts">Back</Link>
+          <div style={{ display: "flex", gap: 8 }}>
+            <label className="btn">
+              New revision
+              <input
+                type="file"
+                accept=".txt,.md,.markdown"
+                hidden
+                disabled={!!busyKey}
+                onChange={(e) => onRevisionFile(e.target.files?.[0])}
+              />
+            </label>
+            <Link className="btn" to="/contracts">Back</Link>
+          </div>
         </div>
 
         {c.error_message && (
@@ -138,7 +189,11 @@ export default function ContractDetail() {
           </tbody>
         </table>
 
-        {busyKey && <div className="muted" style={{ marginTop: 10 }}>Saving…</div>}
+        {busyKey && (
+          <div className="muted" style={{ marginTop: 10 }}>
+            {busyKey === "revision" ? "Uploading revision…" : "Saving…"}
+          </div>
+        )}
       </div>
     </div>
   );
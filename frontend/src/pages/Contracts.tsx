@@ -1,20 +1,47 @@
 import { useEffect, useState } from "react";
 import { Link } from "react-router-dom";
-import { listContracts, ContractListItem } from "../api";
+import { listContracts, subscribeContractEvents, ContractListItem } from "../api";
 
 export default function Contracts() {
   const [items, setItems] = useState<ContractListItem[]>([]);
   const [err, setErr] = useState<string | null>(null);
 
+  async function load() {
+    try {
+      const r = await listContracts();
+      setItems(r.items);
+    } catch (e: any) {
+      setErr(e?.message ?? String(e));
+    }
+  }
+
+  useEffect(() => {
+    load();
+  }, []);
+
+  // Live status updates instead of polling: patch known rows, add new contracts from the event itself.
   useEffect(() => {
-    (async () => {
-      try {
-        const r = await listContracts();
-        setItems(r.items);
-      } catch (e: any) {
-        setErr(e?.message ?? String(e));
-      }
-    })();
+    return subscribeContractEvents(null, (e) => {
+      if (e.type !== "status") return;
+      setItems((prev) => {
+        if (!prev.some((c) => c.id === e.contract_id)) {
+          if (!e.original_filename || !e.created_at) return prev;
+          const row: ContractListItem = {
+            id: e.contract_id,
+            original_filename: e.original_filename,
+            processing_status: e.processing_status ?? "uploaded",
+            created_at: e.created_at,
+            processed_at: e.processed_at ?? null,
+          };
+          return [row, ...prev].sort((a, b) => b.id - a.id);
+        }
+        return prev.map((c) =>
+          c.id === e.contract_id
+            ? { ...c, processing_status: e.processing_status ?? c.processing_status, processed_at: e.processed_at ?? c.processed_at }
+            : c,
+        );
+      });
+    });
   }, []);
 
   return (